@@ -0,0 +1,21 @@
+// Mirrors normalize_keyword in scripts/keywords.py, which fills the
+// keywords_normalized field at ingest. Keep the two in sync.
+export function normalizeKeyword(keyword: string): string {
+  let normalized = keyword.trim().toLowerCase();
+  if (normalized.length > 1 && normalized.endsWith("s")) {
+    normalized = normalized.slice(0, -1);
+  }
+  return normalized;
+}
+
+// Normalized, deduplicated keywords in their original order
+export function normalizeKeywords(keywords: string[]): string[] {
+  const normalized: string[] = [];
+  for (const keyword of keywords) {
+    const value = normalizeKeyword(keyword);
+    if (value && !normalized.includes(value)) {
+      normalized.push(value);
+    }
+  }
+  return normalized;
+}
@@ -0,0 +1,265 @@
+import copy
+import itertools
+from typing import Dict, List
+
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateOne
+
+
+def get_path(doc: Dict, path: str):
+    for key in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(key)
+    return doc
+
+
+def set_path(doc: Dict, path: str, value):
+    *parents, key = path.split(".")
+    for parent in parents:
+        doc = doc.setdefault(parent, {})
+    doc[key] = value
+
+
+def is_operator_condition(condition) -> bool:
+    return isinstance(condition, dict) and any(key.startswith("$") for key in condition)
+
+
+def is_in_condition(condition) -> bool:
+    return isinstance(condition, dict) and condition.keys() == {"$in"}
+
+
+def matches_condition(value, condition) -> bool:
+    if not is_operator_condition(condition):
+        if isinstance(value, list) and not isinstance(condition, list):
+            return condition in value
+        return value == condition
+    for operator, argument in condition.items():
+        values = value if isinstance(value, list) else [value]
+        if operator == "$in":
+            if not any(item in argument for item in values):
+                return False
+        elif operator == "$nin":
+            if any(item in argument for item in values):
+                return False
+        elif operator == "$exists":
+            if (value is not None) != argument:
+                return False
+        else:
+            raise NotImplementedError(f"Unsupported query operator {operator}")
+    return True
+
+
+def matches(doc: Dict, query: Dict) -> bool:
+    return all(
+        matches_condition(get_path(doc, path), condition)
+        for path, condition in query.items()
+    )
+
+
+def project(doc: Dict, projection: Dict | None) -> Dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    projected = {"_id": doc["_id"]}
+    for path, include in projection.items():
+        value = get_path(doc, path)
+        if include and value is not None:
+            set_path(projected, path, copy.deepcopy(value))
+    return projected
+
+
+class FakeCursor:
+    def __init__(self, docs: List[Dict]):
+        self.docs = docs
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, count: int):
+        if count:
+            self.docs = self.docs[:count]
+        return self
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        for doc in self.docs:
+            yield doc
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+class FakeBulkWriteResult:
+    def __init__(self, upserted_count: int = 0, modified_count: int = 0):
+        self.upserted_count = upserted_count
+        self.modified_count = modified_count
+
+
+class FakeCollection:
+    """
+    In-memory stand-in for the AsyncCollection calls the scripts make.
+
+    Equality parts of a query are answered from hash indexes built lazily per
+    set of fields, so upserts by name stay O(1) on large benchmark runs.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str):
+        self.name = name
+        self.docs: Dict[object, Dict] = {}
+        self.hash_indexes: Dict[tuple, Dict[tuple, set]] = {}
+        self.index_models = []
+
+    def index_key(self, doc: Dict, fields: tuple) -> tuple:
+        return tuple(repr(get_path(doc, field)) for field in fields)
+
+    def get_hash_index(self, fields: tuple) -> Dict[tuple, set]:
+        if fields not in self.hash_indexes:
+            index = {}
+            for doc_id, doc in self.docs.items():
+                index.setdefault(self.index_key(doc, fields), set()).add(doc_id)
+            self.hash_indexes[fields] = index
+        return self.hash_indexes[fields]
+
+    def add_to_indexes(self, doc: Dict):
+        for fields, index in self.hash_indexes.items():
+            index.setdefault(self.index_key(doc, fields), set()).add(doc["_id"])
+
+    def remove_from_indexes(self, doc: Dict):
+        for fields, index in self.hash_indexes.items():
+            index.get(self.index_key(doc, fields), set()).discard(doc["_id"])
+
+    def candidates(self, query: Dict) -> List[Dict]:
+        equality = {
+            path: condition
+            for path, condition in query.items()
+            if not is_operator_condition(condition) and not isinstance(condition, list)
+        }
+        if equality:
+            fields = tuple(sorted(equality))
+            key = tuple(repr(equality[field]) for field in fields)
+            ids = self.get_hash_index(fields).get(key, ())
+        elif len(query) == 1 and is_in_condition(next(iter(query.values()))):
+            # {"field": {"$in": [...]}}: one hash lookup per value
+            [(path, condition)] = query.items()
+            index = self.get_hash_index((path,))
+            ids = set()
+            for value in condition["$in"]:
+                ids.update(index.get((repr(value),), ()))
+        else:
+            ids = list(self.docs)
+        docs = [self.docs[doc_id] for doc_id in ids]
+        return [doc for doc in docs if matches(doc, query)]
+
+    def insert(self, doc: Dict):
+        doc.setdefault("_id", next(self._ids))
+        self.docs[doc["_id"]] = doc
+        self.add_to_indexes(doc)
+
+    def apply_update(self, doc: Dict, update: Dict, inserting: bool):
+        self.remove_from_indexes(doc)
+        for path, value in update.get("$set", {}).items():
+            set_path(doc, path, copy.deepcopy(value))
+        if inserting:
+            for path, value in update.get("$setOnInsert", {}).items():
+                set_path(doc, path, copy.deepcopy(value))
+        self.add_to_indexes(doc)
+
+    def find(self, query: Dict | None = None, projection: Dict | None = None):
+        return FakeCursor(
+            [project(doc, projection) for doc in self.candidates(query or {})]
+        )
+
+    async def find_one(self, query: Dict | None = None, projection=None):
+        docs = self.candidates(query or {})
+        return project(docs[0], projection) if docs else None
+
+    async def count_documents(self, query: Dict):
+        return len(self.candidates(query))
+
+    async def insert_one(self, doc: Dict):
+        self.insert(copy.deepcopy(doc))
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        docs = self.candidates(query)
+        if docs:
+            self.apply_update(docs[0], update, inserting=False)
+        elif upsert:
+            doc = {
+                path: value
+                for path, value in query.items()
+                if not is_operator_condition(value)
+            }
+            self.insert(doc)
+            self.apply_update(doc, update, inserting=True)
+
+    async def replace_one(self, query: Dict, replacement: Dict, upsert: bool = False):
+        docs = self.candidates(query)
+        if docs:
+            await self.delete_one({"_id": docs[0]["_id"]})
+            replacement = {**replacement, "_id": docs[0]["_id"]}
+        elif not upsert:
+            return
+        self.insert(copy.deepcopy(replacement))
+
+    async def delete_one(self, query: Dict):
+        docs = self.candidates(query)
+        if docs:
+            self.remove_from_indexes(docs[0])
+            del self.docs[docs[0]["_id"]]
+
+    async def delete_many(self, query: Dict):
+        for doc in self.candidates(query):
+            self.remove_from_indexes(doc)
+            del self.docs[doc["_id"]]
+
+    async def bulk_write(self, operations, ordered: bool = True):
+        for operation in operations:
+            if isinstance(operation, UpdateOne):
+                await self.update_one(
+                    operation._filter, operation._doc, upsert=operation._upsert
+                )
+            elif isinstance(operation, ReplaceOne):
+                await self.replace_one(
+                    operation._filter, operation._doc, upsert=operation._upsert
+                )
+            elif isinstance(operation, InsertOne):
+                await self.insert_one(operation._doc)
+            elif isinstance(operation, DeleteOne):
+                await self.delete_one(operation._filter)
+            elif isinstance(operation, DeleteMany):
+                await self.delete_many(operation._filter)
+            else:
+                raise NotImplementedError(f"Unsupported bulk operation {operation}")
+        return FakeBulkWriteResult()
+
+    async def create_indexes(self, models):
+        self.index_models.extend(models)
+        return [model.document["name"] for model in models]
+
+    async def create_index(self, keys, **kwargs):
+        return kwargs.get("name", str(keys))
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name: str) -> FakeCollection:
+        collection = self[name] = FakeCollection(name)
+        return collection
+
+
+class FakeMongoClient(dict):
+    """Drop-in for AsyncMongoClient in benchmarks: client[db][collection]."""
+
+    def __missing__(self, name: str) -> FakeDatabase:
+        database = self[name] = FakeDatabase()
+        return database
+
+    def __bool__(self):
+        # An empty dict is falsy, which would make `client or get_client()`
+        # connect to a real server
+        return True
+
+    async def close(self):
+        pass
@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from pymongo import AsyncMongoClient
+
+from ..fetchPackagesWithInfo import TopPackagesFetcher
+from ..packageIngester import NPMPackageIngester
+from ..processPackagesInfo import NPMPackageProcessor
+from ..updateExistingPackages import NPMPackageUpdater
+from .fakeMongo import FakeMongoClient
+from .upstreamSimulator import point_at_simulator
+
+
+def start_simulator(port: int, simulator_args: List[str]) -> subprocess.Popen:
+    """Run the upstream simulator in its own process and wait for its port."""
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "scripts.benchmarks.upstreamSimulator",
+            "--port",
+            str(port),
+            *simulator_args,
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Upstream simulator exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Upstream simulator did not start listening")
+
+
+def instrument(ingester: NPMPackageIngester) -> Dict[str, List[float]]:
+    """Record the duration of every ingest_package call and every bulk flush."""
+    timings = {"package": [], "write": []}
+
+    def timed(method, timing_list):
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                timing_list.append(time.perf_counter() - start)
+
+        return wrapper
+
+    ingester.ingest_package = timed(ingester.ingest_package, timings["package"])
+    for sink in (
+        ingester.write_sink,
+        ingester.history_store.write_sink,
+        ingester.reverse_dependencies.write_sink,
+    ):
+        sink.flush = timed(sink.flush, timings["write"])
+    return timings
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def phase_result(
+    phase: str, elapsed: float, package_count: int, timings: Dict | None = None
+) -> Dict:
+    timings = timings or {"package": [], "write": []}
+    return {
+        "phase": phase,
+        "packages": package_count,
+        "elapsed_s": elapsed,
+        "packages_per_s": package_count / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(timings["package"], 0.50) * 1000,
+        "p99_ms": percentile(timings["package"], 0.99) * 1000,
+        "mongo_write_s": sum(timings["write"]),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run_phases(
+    base_url: str,
+    client,
+    depth: int,
+    batch_size: int,
+    concurrency: int,
+    retry_pass_delay: float,
+    parse_workers: int,
+) -> List[Dict]:
+    results = []
+
+    fetcher = TopPackagesFetcher(output_file="data/package_names.ndjson", depth=depth)
+    point_at_simulator(fetcher, base_url)
+    start = time.perf_counter()
+    names = await fetcher.fetch_all_packages()
+    results.append(phase_result("discover", time.perf_counter() - start, len(names)))
+
+    processor = NPMPackageProcessor(
+        "data/package_names.ndjson",
+        batch_size=batch_size,
+        client=client,
+        concurrency=concurrency,
+    )
+    point_at_simulator(processor, base_url)
+    processor.retry_pass_delay = retry_pass_delay
+    processor.parse_workers = parse_workers
+    timings = instrument(processor)
+    start = time.perf_counter()
+    await processor.process_packages()
+    results.append(
+        phase_result(
+            "process",
+            time.perf_counter() - start,
+            processor.total_processed,
+            timings,
+        )
+    )
+
+    # Second pass over the stored packages: conditional registry requests,
+    # cached ecosyste.ms stats and only the newest download days
+    updater = NPMPackageUpdater(
+        batch_size=batch_size, client=client, concurrency=concurrency
+    )
+    point_at_simulator(updater, base_url)
+    updater.retry_pass_delay = retry_pass_delay
+    updater.parse_workers = parse_workers
+    timings = instrument(updater)
+    start = time.perf_counter()
+    await updater.update_all_packages()
+    results.append(
+        phase_result(
+            "update",
+            time.perf_counter() - start,
+            updater.total_processed,
+            timings,
+        )
+    )
+    return results
+
+
+def print_results(results: List[Dict]):
+    print("\n=== Ingestion Benchmark ===")
+    for result in results:
+        print(
+            f"{result['phase']:>8}: {result['packages']} packages in "
+            f"{result['elapsed_s']:.2f}s ({result['packages_per_s']:.1f}/s), "
+            f"p50 {result['p50_ms']:.1f}ms, p99 {result['p99_ms']:.1f}ms, "
+            f"mongo writes {result['mongo_write_s']:.2f}s, "
+            f"peak RSS {result['peak_rss_mb']:.0f}MB"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark discovery, processing and updating against a "
+        "local upstream simulator."
+    )
+    parser.add_argument("--packages", type=int, default=2000, help="Top list depth")
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument(
+        "--mongo-uri",
+        default=None,
+        help="Scratch mongod to write to (its npm-leaderboard database is "
+        "overwritten); defaults to an in-memory fake",
+    )
+    parser.add_argument("--latency", default="0.02", help="Simulated seconds")
+    parser.add_argument("--jitter", default="0.01", help="Simulated seconds")
+    parser.add_argument("--error-rate", default="0")
+    parser.add_argument("--throttle-rate", default="0")
+    parser.add_argument("--packument-versions", default="50")
+    parser.add_argument(
+        "--recorded", default=None, help="Directory of recorded packument files"
+    )
+    parser.add_argument(
+        "--retry-pass-delay",
+        type=float,
+        default=5.0,
+        help="Seconds before the end-of-run retry pass (60 in real runs)",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="Packument parse processes (0 parses in the event loop's thread)",
+    )
+    parser.add_argument("--json", default=None, help="Also write results here")
+    args = parser.parse_args()
+
+    simulator_args = [
+        "--latency",
+        args.latency,
+        "--jitter",
+        args.jitter,
+        "--error-rate",
+        args.error_rate,
+        "--throttle-rate",
+        args.throttle_rate,
+        "--packument-versions",
+        args.packument_versions,
+        "--total-names",
+        str(args.packages),
+    ]
+    if args.recorded:
+        simulator_args += ["--recorded", os.path.abspath(args.recorded)]
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    simulator = start_simulator(args.port, simulator_args)
+    client = AsyncMongoClient(args.mongo_uri) if args.mongo_uri else FakeMongoClient()
+    working_dir = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Logs, the package list and the stats cache all go under data/
+            os.chdir(temp_dir)
+            results = await run_phases(
+                f"http://127.0.0.1:{args.port}",
+                client,
+                args.packages,
+                args.batch_size,
+                args.concurrency,
+                args.retry_pass_delay,
+                args.parse_workers,
+            )
+    finally:
+        os.chdir(working_dir)
+        await client.close()
+        simulator.terminate()
+        simulator.wait()
+
+    print_results(results)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+import argparse
+import io
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List
+
+from ..packumentParser import parse_packument_file, summarize_packument
+
+
+def make_synthetic_packument(version_count: int) -> bytes:
+    """Build a packument shaped like the registry's, with many fat versions."""
+    versions = {}
+    for i in range(version_count):
+        version = f"{i // 100}.{i % 100}.0"
+        versions[version] = {
+            "name": "synthetic",
+            "version": version,
+            "description": "A synthetic package " * 10,
+            "dependencies": {f"dep-{j}": f"^{j}.0.0" for j in range(15)},
+            "devDependencies": {f"dev-dep-{j}": f"^{j}.0.0" for j in range(40)},
+            "peerDependencies": {"react": "*"},
+            "scripts": {"build": "tsc -p .", "test": "jest"},
+            "dist": {
+                "shasum": "0" * 40,
+                "tarball": f"https://registry.npmjs.org/synthetic/-/{version}.tgz",
+                "integrity": "sha512-" + "A" * 86,
+            },
+        }
+    latest = next(reversed(versions))
+    packument = {
+        "_id": "synthetic",
+        "name": "synthetic",
+        "dist-tags": {"latest": latest},
+        "versions": versions,
+        "time": {
+            "created": "2015-01-01T00:00:00.000Z",
+            "modified": "2025-01-01T00:00:00.000Z",
+            **{version: "2020-01-01T00:00:00.000Z" for version in versions},
+        },
+        "description": "A synthetic package",
+        "keywords": ["synthetic", "benchmark"],
+        "readme": "# synthetic\n" * 2000,
+    }
+    return json.dumps(packument).encode()
+
+
+def measure(parse: Callable[[bytes], dict], body: bytes, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(body)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"best_ms": min(timings) * 1000, "peak_mb": peak / 1024 / 1024}
+
+
+def parse_full(body: bytes) -> dict:
+    return summarize_packument(json.loads(body))
+
+
+def parse_streaming(body: bytes) -> dict:
+    # Feed the body in network-sized chunks like the aiohttp stream does
+    return parse_packument_file(io.BufferedReader(io.BytesIO(body), 64 * 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare full json parsing with the streaming packument extractor."
+    )
+    parser.add_argument(
+        "packuments",
+        nargs="*",
+        help="Recorded packument files (e.g. curl https://registry.npmjs.org/typescript)",
+    )
+    parser.add_argument(
+        "--synthetic-versions",
+        type=int,
+        default=3000,
+        help="Version count of the synthetic packument used when no files are given",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bodies: List[tuple[str, bytes]] = [
+        (path, Path(path).read_bytes()) for path in args.packuments
+    ]
+    if not bodies:
+        bodies.append(
+            (
+                f"synthetic ({args.synthetic_versions} versions)",
+                make_synthetic_packument(args.synthetic_versions),
+            )
+        )
+
+    for label, body in bodies:
+        if parse_full(body) != parse_streaming(body):
+            print(f"{label}: streaming summary differs from the full parse!")
+        print(f"\n{label}: {len(body) / 1024 / 1024:.1f} MB")
+        for name, parse in (("json.loads", parse_full), ("streaming", parse_streaming)):
+            result = measure(parse, body, args.repeat)
+            print(
+                f"  {name:>10}: {result['best_ms']:8.1f} ms, "
+                f"peak {result['peak_mb']:7.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
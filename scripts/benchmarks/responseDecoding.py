@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import aiohttp
+
+from ..upstreamSchemas import (
+    decode_bulk_downloads_range,
+    decode_downloads_range,
+    decode_ecosystem_stats,
+    decode_packument,
+)
+from .packumentParsing import make_synthetic_packument, parse_full, parse_streaming
+from .upstreamSimulator import UpstreamSimulator
+
+# Corpus layout: one recorded response body per file in each directory
+CORPUS_KINDS = ("registry", "downloads", "ecosystems")
+
+RECORD_URLS = {
+    "registry": "https://registry.npmjs.org/{name}",
+    "downloads": "https://api.npmjs.org/downloads/range/last-year/{name}",
+    "ecosystems": (
+        "https://packages.ecosyste.ms/api/v1/registries/npmjs.org/packages/{name}"
+    ),
+}
+
+
+def load_corpus(corpus_dir: Path) -> Dict[str, List[bytes]]:
+    return {
+        kind: [path.read_bytes() for path in sorted((corpus_dir / kind).glob("*"))]
+        for kind in CORPUS_KINDS
+    }
+
+
+def make_synthetic_corpus() -> Dict[str, List[bytes]]:
+    """Packuments of several sizes, 128-name bulk ranges and ecosyste.ms stats."""
+    simulator = UpstreamSimulator()
+    names = [f"pkg-{i}" for i in range(128)]
+    bulk_range = {
+        name: {
+            "package": name,
+            "start": "2025-01-01",
+            "end": "2025-12-31",
+            "downloads": simulator.daily_downloads(name, "2025-01-01", "2025-12-31"),
+        }
+        for name in names
+    }
+    return {
+        "registry": [make_synthetic_packument(count) for count in (5, 50, 500, 3000)],
+        "downloads": [json.dumps(bulk_range).encode()] * 4,
+        "ecosystems": [
+            json.dumps(
+                {
+                    "name": name,
+                    "downloads": 123456,
+                    "dependent_packages_count": 42,
+                    "dependent_repos_count": 4242,
+                    "description": "A package " * 20,
+                    "keywords": ["a", "b"],
+                    "repo_metadata": {"topics": ["x"] * 50},
+                }
+            ).encode()
+            for name in names
+        ],
+    }
+
+
+async def record_corpus(corpus_dir: Path, names: List[str]):
+    """Save live responses of `names` from each upstream into the corpus."""
+    async with aiohttp.ClientSession() as session:
+        for kind, url in RECORD_URLS.items():
+            (corpus_dir / kind).mkdir(parents=True, exist_ok=True)
+            for name in names:
+                async with session.get(url.format(name=name)) as response:
+                    if response.status != 200:
+                        print(f"Skipping {kind} {name}: {response.status}")
+                        continue
+                    body = await response.read()
+                file_name = name.replace("/", "__") + ".json"
+                (corpus_dir / kind / file_name).write_bytes(body)
+
+
+def decode_range_msgspec(body: bytes):
+    # The first value of a bulk response is a package's range object (or null);
+    # a single-package response starts with a string or the downloads list
+    first_value = body[body.index(b":") + 1 :].lstrip()[:1]
+    if first_value in (b"{", b"n"):
+        return decode_bulk_downloads_range(body)
+    return decode_downloads_range(body)
+
+
+def decode_stats_json(body: bytes) -> Dict:
+    data = json.loads(body)
+    return {
+        "total_downloads": data.get("downloads", 0),
+        "dependent_packages_count": data.get("dependent_packages_count", 0),
+        "dependent_repos_count": data.get("dependent_repos_count", 0),
+    }
+
+
+DECODERS: Dict[str, Dict[str, Callable[[bytes], object]]] = {
+    "registry": {
+        "json.loads": parse_full,
+        "streaming": parse_streaming,
+        "msgspec": decode_packument,
+    },
+    "downloads": {"json.loads": json.loads, "msgspec": decode_range_msgspec},
+    "ecosystems": {"json.loads": decode_stats_json, "msgspec": decode_ecosystem_stats},
+}
+
+
+def cpu_time(decode: Callable[[bytes], object], bodies: List[bytes], repeat: int):
+    """Best CPU time of decoding every body once."""
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        for body in bodies:
+            decode(body)
+        timings.append(time.process_time() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare CPU time of generic and schema-aware response decoding."
+    )
+    parser.add_argument(
+        "--corpus",
+        default=None,
+        help="Directory with registry/, downloads/ and ecosystems/ response files "
+        "(synthetic responses when omitted)",
+    )
+    parser.add_argument(
+        "--record",
+        default=None,
+        help="Comma-separated package names to fetch into --corpus first",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.corpus:
+            parser.error("--record needs --corpus")
+        asyncio.run(record_corpus(Path(args.corpus), args.record.split(",")))
+    corpus = load_corpus(Path(args.corpus)) if args.corpus else make_synthetic_corpus()
+
+    for body in corpus["registry"]:
+        if decode_packument(body) != parse_streaming(body):
+            print("msgspec packument summary differs from the streaming extractor!")
+
+    for kind, decoders in DECODERS.items():
+        bodies = corpus[kind]
+        if not bodies:
+            continue
+        size_mb = sum(map(len, bodies)) / 1024 / 1024
+        print(f"\n{kind}: {len(bodies)} responses, {size_mb:.1f} MB")
+        for name, decode in decoders.items():
+            seconds = cpu_time(decode, bodies, args.repeat)
+            print(
+                f"  {name:>10}: {seconds * 1000:8.1f} ms CPU "
+                f"({size_mb / seconds if seconds else 0:,.0f} MB/s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import datetime
+import random
+import zlib
+from pathlib import Path
+from typing import List
+
+from aiohttp import web
+
+from .packumentParsing import make_synthetic_packument
+
+
+class UpstreamSimulator:
+    """
+    Local stand-in for registry.npmjs.org, api.npmjs.org, packages.ecosyste.ms
+    and the registry changes feed, for offline benchmarks.
+
+    Every response is delayed by `latency` +/- `jitter` seconds. A share of
+    requests fails with a 500 (`error_rate`) or a 429 with Retry-After
+    (`throttle_rate`). Packuments are recorded files served round robin, or a
+    synthetic packument with `packument_versions` versions. The changes feed
+    lists `changed_names` in order, the i-th name at sequence i + 1.
+
+    Routes mirror the real URL layout under one base URL:
+        /registry/{name}
+        /downloads/range/{start}:{end}/{names}
+        /ecosystems/packages/{name}
+        /ecosystems/package_names?page=&per_page=
+        /changes/ and /changes/_changes
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.02,
+        jitter: float = 0.01,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        packument_versions: int = 50,
+        recorded_dir: str | None = None,
+        total_names: int = 100000,
+        changed_names: List[str] | None = None,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.total_names = total_names
+        self.changed_names = changed_names or []
+        self.random = random.Random(seed)
+
+        if recorded_dir:
+            self.packuments = [
+                path.read_bytes() for path in sorted(Path(recorded_dir).iterdir())
+            ]
+        else:
+            self.packuments = [make_synthetic_packument(packument_versions)]
+        self.request_counts = {}
+
+    async def simulate(self, endpoint: str) -> web.Response | None:
+        """Apply latency and injected failures; returns an error response or None."""
+        self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(0.0, delay))
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            return web.Response(
+                status=429, headers={"Retry-After": str(self.retry_after)}
+            )
+        if roll < self.throttle_rate + self.error_rate:
+            return web.Response(status=500)
+        return None
+
+    def get_packument(self, name: str) -> bytes:
+        return self.packuments[zlib.crc32(name.encode()) % len(self.packuments)]
+
+    async def registry(self, request: web.Request):
+        name = request.match_info["name"]
+        error = await self.simulate("registry")
+        if error:
+            return error
+        body = self.get_packument(name)
+        etag = f'"{zlib.crc32(body):x}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            body=body, content_type="application/json", headers={"ETag": etag}
+        )
+
+    def daily_downloads(self, name: str, start: str, end: str):
+        base = zlib.crc32(name.encode()) % 100000
+        day = datetime.date.fromisoformat(start)
+        end_day = datetime.date.fromisoformat(end)
+        downloads = []
+        while day <= end_day:
+            downloads.append(
+                {"day": day.isoformat(), "downloads": base + day.toordinal() % 97}
+            )
+            day += datetime.timedelta(days=1)
+        return downloads
+
+    async def downloads_range(self, request: web.Request):
+        error = await self.simulate("downloads")
+        if error:
+            return error
+        start, end = request.match_info["range"].split(":")
+        names = request.match_info["names"].split(",")
+        ranges = {
+            name: {
+                "package": name,
+                "start": start,
+                "end": end,
+                "downloads": self.daily_downloads(name, start, end),
+            }
+            for name in names
+        }
+        if len(names) == 1:
+            return web.json_response(ranges[names[0]])
+        return web.json_response(ranges)
+
+    async def ecosystem_package(self, request: web.Request):
+        name = request.match_info["name"]
+        error = await self.simulate("ecosystems")
+        if error:
+            return error
+        seed = zlib.crc32(name.encode())
+        return web.json_response(
+            {
+                "name": name,
+                "downloads": seed % 10_000_000,
+                "dependent_packages_count": seed % 5000,
+                "dependent_repos_count": seed % 50000,
+            }
+        )
+
+    async def package_names(self, request: web.Request):
+        error = await self.simulate("package_names")
+        if error:
+            return error
+        page = int(request.query.get("page", 1))
+        per_page = int(request.query.get("per_page", 1000))
+        first = (page - 1) * per_page
+        last = min(first + per_page, self.total_names)
+        return web.json_response([f"pkg-{rank}" for rank in range(first, last)])
+
+    async def changes_info(self, request: web.Request):
+        error = await self.simulate("changes")
+        if error:
+            return error
+        return web.json_response({"update_seq": len(self.changed_names)})
+
+    async def changes(self, request: web.Request):
+        error = await self.simulate("changes")
+        if error:
+            return error
+        since = int(request.query.get("since", 0))
+        limit = int(request.query.get("limit", 1000))
+        results = [
+            {"seq": seq, "id": name}
+            for seq, name in enumerate(self.changed_names, start=1)
+        ][since : since + limit]
+        last_seq = results[-1]["seq"] if results else since
+        return web.json_response({"results": results, "last_seq": last_seq})
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/registry/{name:.+}", self.registry)
+        app.router.add_get("/downloads/range/{range}/{names:.+}", self.downloads_range)
+        app.router.add_get("/ecosystems/packages/{name:.+}", self.ecosystem_package)
+        app.router.add_get("/ecosystems/package_names", self.package_names)
+        app.router.add_get("/changes/", self.changes_info)
+        app.router.add_get("/changes/_changes", self.changes)
+        return app
+
+
+def point_at_simulator(target, base_url: str):
+    """Redirect an ingester's or a TopPackagesFetcher's upstream URLs."""
+    if hasattr(target, "trends_fetcher"):
+        target.registry_url = f"{base_url}/registry"
+        target.downloads_url = f"{base_url}/downloads"
+        target.trends_fetcher.downloads_url = target.downloads_url
+        target.ecosystem_url = f"{base_url}/ecosystems/packages"
+        target.changes_feed.base_url = f"{base_url}/changes"
+    else:
+        target.base_url = f"{base_url}/ecosystems/package_names"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve simulated npm and ecosyste.ms APIs for offline benchmarks."
+    )
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1, help="Seconds")
+    parser.add_argument("--packument-versions", type=int, default=50)
+    parser.add_argument(
+        "--recorded", default=None, help="Directory of recorded packument files"
+    )
+    parser.add_argument("--total-names", type=int, default=100000)
+    args = parser.parse_args()
+
+    simulator = UpstreamSimulator(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        packument_versions=args.packument_versions,
+        recorded_dir=args.recorded,
+        total_names=args.total_names,
+    )
+    web.run_app(simulator.make_app(), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import datetime
+import random
+import time
+from typing import Callable, Dict, List
+
+from ..downloadTrends import compute_growth_metrics, group_weekly_downloads
+from ..weeklyAggregation import summarize_daily_downloads
+
+
+def make_daily_series(
+    package_count: int, day_count: int, seed: int = 0
+) -> List[List[Dict]]:
+    """Daily downloads shaped like the range API's, starting mid-week."""
+    rng = random.Random(seed)
+    start = datetime.date(2025, 1, 1)  # A Wednesday
+    days = [
+        (start + datetime.timedelta(days=i)).strftime("%Y-%m-%d")
+        for i in range(day_count)
+    ]
+    series = []
+    for _ in range(package_count):
+        scale = rng.choice((0, 10, 1000, 100000))
+        series.append(
+            [{"day": day, "downloads": rng.randint(0, scale)} for day in days]
+        )
+    return series
+
+
+def summarize_loop(daily_series: List[List[Dict]]) -> List[Dict]:
+    """The per-package loop: strptime and Python sums for every day."""
+    summaries = []
+    for daily_downloads in daily_series:
+        weekly_trends = group_weekly_downloads(daily_downloads)
+        summaries.append(
+            {
+                "weekly_trends": weekly_trends,
+                "growth": compute_growth_metrics(weekly_trends),
+            }
+        )
+    return summaries
+
+
+def best_time(summarize: Callable, daily_series, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        summarize(daily_series)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def matches(expected: List[Dict], actual: List[Dict]) -> bool:
+    for loop_summary, vector_summary in zip(expected, actual):
+        if loop_summary["weekly_trends"] != vector_summary["weekly_trends"]:
+            return False
+        for field, value in loop_summary["growth"].items():
+            if abs(value - vector_summary["growth"][field]) > 1e-6:
+                return False
+    return len(expected) == len(actual)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the per-package weekly loop with the NumPy aggregation."
+    )
+    parser.add_argument("--packages", type=int, default=10000)
+    parser.add_argument(
+        "--days", type=int, default=60, help="Days per package (8 weeks plus edges)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=128,
+        help="Packages aggregated together, as in one bulk downloads request",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    daily_series = make_daily_series(args.packages, args.days)
+    chunks = [
+        daily_series[i : i + args.chunk_size]
+        for i in range(0, len(daily_series), args.chunk_size)
+    ]
+
+    def summarize_chunks(series):
+        return [
+            summary for chunk in chunks for summary in summarize_daily_downloads(chunk)
+        ]
+
+    if not matches(summarize_loop(daily_series), summarize_chunks(daily_series)):
+        print("NumPy summaries differ from the per-package loop!")
+
+    print(f"{args.packages} packages x {args.days} days")
+    for name, summarize in (
+        ("per-package loop", summarize_loop),
+        (f"numpy, {args.chunk_size}/chunk", summarize_chunks),
+        ("numpy, one pass", summarize_daily_downloads),
+    ):
+        seconds = best_time(summarize, daily_series, args.repeat)
+        print(
+            f"  {name:>20}: {seconds * 1000:8.1f} ms "
+            f"({args.packages / seconds:,.0f} packages/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import time
+from typing import Callable, List, Tuple
+
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import BulkWriteError
+
+from .metrics import MetricsRegistry
+
+
+class BulkWriteSink:
+    """
+    Buffer MongoDB write operations and flush them as unordered bulk_write batches.
+
+    Each queued operation is tagged with the package name it belongs to, so a
+    failed write can still be reported per package through `on_error`.
+    The duration and size of every bulk_write are recorded in `metrics`.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncCollection,
+        on_error: Callable[[str, str], None],
+        max_batch_size: int = 500,
+        flush_interval: float = 10.0,
+        metrics: MetricsRegistry | None = None,
+    ):
+        self.collection = collection
+        self.on_error = on_error
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval  # Seconds between time-based flushes
+        self.metrics = metrics or MetricsRegistry()
+
+        self.pending: List[Tuple[str, object]] = []
+        self.last_flush_time = time.time()
+        self.total_written = 0
+        self.total_failed = 0
+
+    async def add(self, package_name: str, operation):
+        """Queue a write operation, flushing if the buffer is full or stale."""
+        self.pending.append((package_name, operation))
+        if (
+            len(self.pending) >= self.max_batch_size
+            or time.time() - self.last_flush_time >= self.flush_interval
+        ):
+            await self.flush()
+
+    async def flush(self):
+        """Write all pending operations in a single unordered bulk_write."""
+        self.last_flush_time = time.time()
+        if not self.pending:
+            return
+
+        # Swap the buffer out before awaiting so concurrent adds start a new one
+        batch, self.pending = self.pending, []
+        labels = {"collection": self.collection.name}
+        self.metrics.inc("mongo_write_operations_total", len(batch), **labels)
+        try:
+            with self.metrics.timer("mongo_write_seconds", **labels):
+                await self.collection.bulk_write([op for _, op in batch], ordered=False)
+            self.total_written += len(batch)
+        except BulkWriteError as e:
+            # Unordered writes keep going past errors, so only the reported
+            # indexes failed; everything else in the batch was applied.
+            write_errors = e.details.get("writeErrors", [])
+            for write_error in write_errors:
+                package_name = batch[write_error["index"]][0]
+                self.on_error(package_name, write_error.get("errmsg", str(e)))
+            self.total_failed += len(write_errors)
+            self.total_written += len(batch) - len(write_errors)
+        except Exception as e:
+            for package_name, _ in batch:
+                self.on_error(package_name, str(e))
+            self.total_failed += len(batch)
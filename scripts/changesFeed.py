@@ -0,0 +1,88 @@
+import os
+from typing import Set
+
+from .httpClient import RateLimitedSession
+from .retryPolicy import RetryPolicy, UpstreamError
+
+
+def seq_number(seq) -> int:
+    """
+    The numeric position of an update sequence. CouchDB-style sequences are
+    opaque strings like "123-g1AAAA..." that only order by their number, so
+    they must not be compared as strings.
+    """
+    if isinstance(seq, int):
+        return seq
+    prefix = str(seq).split("-", 1)[0]
+    if not prefix.isdigit():
+        raise ValueError(f"Unrecognized changes feed sequence: {seq!r}")
+    return int(prefix)
+
+
+class RegistryChangesFeed:
+    """
+    Read the npm registry's CouchDB-style `_changes` feed.
+
+    The base URL can point at a local stand-in server through the
+    NPM_CHANGES_URL environment variable. Every request is retried under
+    `retry_policy`; a failure that outlasts it raises UpstreamError.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        page_size: int = 10000,
+        retry_policy: RetryPolicy | None = None,
+    ):
+        self.base_url = base_url or os.getenv(
+            "NPM_CHANGES_URL", "https://replicate.npmjs.com/registry"
+        )
+        self.page_size = page_size
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    async def get_json(
+        self, session: RateLimitedSession, url: str, message: str, **kwargs
+    ):
+        async def fetch():
+            async with session.get(url, **kwargs) as response:
+                if response.status != 200:
+                    raise UpstreamError.from_response(message, response)
+                return await session.read_json(response)
+
+        return await self.retry_policy.run(
+            fetch, on_retry=lambda error, delay: session.record_retry(url)
+        )
+
+    async def get_current_seq(self, session: RateLimitedSession):
+        """Return the registry's current update sequence."""
+        data = await self.get_json(
+            session, f"{self.base_url}/", "Failed to fetch registry info"
+        )
+        return data["update_seq"]
+
+    async def fetch_changed_names(
+        self, session: RateLimitedSession, since
+    ) -> tuple[Set[str], object]:
+        """
+        Page through the feed from `since` to its current end.
+        Returns (names of changed packages, last sequence read).
+        """
+        changed_names = set()
+        last_seq = since
+        while True:
+            data = await self.get_json(
+                session,
+                f"{self.base_url}/_changes",
+                f"Failed to fetch changes since {last_seq}",
+                params={"since": str(last_seq), "limit": self.page_size},
+            )
+
+            results = data.get("results", [])
+            for change in results:
+                # Design documents are not packages
+                if not change["id"].startswith("_design/"):
+                    changed_names.add(change["id"])
+            last_seq = data.get("last_seq", last_seq)
+
+            if len(results) < self.page_size:
+                return changed_names, last_seq
@@ -0,0 +1,27 @@
+from typing import Dict, Mapping
+
+
+def get_registry_validators(headers: Mapping[str, str]) -> Dict:
+    """
+    Extract the cache validators from a registry response.
+    They are stored next to the package document as `registry_cache`.
+    """
+    return {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+
+
+def get_conditional_headers(registry_cache: Dict | None) -> Dict[str, str]:
+    """
+    Build If-None-Match / If-Modified-Since headers from stored validators.
+    Returns no headers if nothing was stored for the package yet.
+    """
+    headers = {}
+    if not registry_cache:
+        return headers
+    if registry_cache.get("etag"):
+        headers["If-None-Match"] = registry_cache["etag"]
+    if registry_cache.get("last_modified"):
+        headers["If-Modified-Since"] = registry_cache["last_modified"]
+    return headers
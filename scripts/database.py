@@ -0,0 +1,27 @@
+import os
+from typing import Optional
+
+from pymongo import AsyncMongoClient
+
+DATABASE_NAME = "npm-leaderboard"
+
+_client: Optional[AsyncMongoClient] = None
+
+
+def get_client() -> AsyncMongoClient:
+    """
+    Return the shared AsyncMongoClient, creating it on first use.
+    All ingestion classes in a run share this client and its connection pool.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncMongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
+    return _client
+
+
+async def close_client():
+    """Close the shared client, if one was created."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
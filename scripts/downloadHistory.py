@@ -0,0 +1,137 @@
+import datetime
+import sys
+from array import array
+from typing import Dict, List
+
+from pymongo import UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+
+from .bulkWriter import BulkWriteSink
+from .metrics import MetricsRegistry
+
+# Daily downloads kept per package; enough for 52-week trends
+HISTORY_DAYS = 53 * 7
+
+# Latest stored days fetched again on the next run: api.npmjs.org can report
+# a recent day as 0 or partial before its counts are complete
+REFETCH_DAYS = 3
+
+
+def pack_counts(counts: List[int]) -> bytes:
+    """Pack daily counts as little-endian uint32 (4 bytes per day)."""
+    packed = array("I", counts)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_counts(data: bytes) -> List[int]:
+    counts = array("I")
+    counts.frombytes(data)
+    if sys.byteorder == "big":
+        counts.byteswap()
+    return counts.tolist()
+
+
+class DownloadHistory:
+    """Daily download counts of one package, one per day from `start` on."""
+
+    def __init__(self, start: datetime.date | None = None, counts=None):
+        self.start = start
+        self.counts: List[int] = list(counts or [])
+
+    @property
+    def end(self) -> datetime.date | None:
+        """Last stored day, or None for an empty history."""
+        if self.start is None or not self.counts:
+            return None
+        return self.start + datetime.timedelta(days=len(self.counts) - 1)
+
+    @classmethod
+    def from_document(cls, doc: Dict) -> "DownloadHistory":
+        return cls(
+            datetime.date.fromisoformat(doc["start"]), unpack_counts(doc["counts"])
+        )
+
+    def to_fields(self) -> Dict:
+        return {"start": self.start.isoformat(), "counts": pack_counts(self.counts)}
+
+    def extend(self, daily_downloads: List[Dict]):
+        """
+        Add days from the downloads range API, overwriting days already stored.
+        Days it skipped count as 0.
+        """
+        for day_data in daily_downloads:
+            day = datetime.date.fromisoformat(day_data["day"])
+            if self.start is None:
+                self.start = day
+            index = (day - self.start).days
+            if index < 0:
+                continue  # Older than what we keep
+            if index >= len(self.counts):
+                self.counts.extend([0] * (index + 1 - len(self.counts)))
+            self.counts[index] = day_data["downloads"]
+
+    def trim(self, first_day: datetime.date):
+        """Drop the days before `first_day`."""
+        if self.start is not None and self.start < first_day:
+            del self.counts[: (first_day - self.start).days]
+            self.start = first_day if self.counts else None
+
+    def daily_downloads(self, start: datetime.date, end: datetime.date) -> List[Dict]:
+        """Stored days between `start` and `end` in the range API's format."""
+        if self.start is None:
+            return []
+        first = max(0, (start - self.start).days)
+        last = min(len(self.counts) - 1, (end - self.start).days)
+        return [
+            {
+                "day": (self.start + datetime.timedelta(days=i)).isoformat(),
+                "downloads": self.counts[i],
+            }
+            for i in range(first, last + 1)
+        ]
+
+
+class DownloadHistoryStore:
+    """
+    Load and save per-package download histories.
+    Each document holds the first day and the packed daily counts, so a run
+    only has to fetch the days after the last stored one (plus REFETCH_DAYS).
+    """
+
+    def __init__(
+        self, collection: AsyncCollection, metrics: MetricsRegistry | None = None
+    ):
+        self.collection = collection
+        self.write_sink = BulkWriteSink(
+            collection, self.log_failed_write, metrics=metrics
+        )
+
+    def log_failed_write(self, package_name: str, error: str):
+        # The next run refetches the missing days, so this is not fatal
+        print(f"✗ Error saving download history of {package_name}: {error}")
+
+    async def load(self, package_names: List[str]) -> Dict[str, DownloadHistory]:
+        return {
+            doc["name"]: DownloadHistory.from_document(doc)
+            async for doc in self.collection.find({"name": {"$in": package_names}})
+        }
+
+    async def save(self, package_name: str, history: DownloadHistory):
+        await self.write_sink.add(
+            package_name,
+            UpdateOne(
+                {"name": package_name},
+                {
+                    "$set": {
+                        **history.to_fields(),
+                        "updated_at": datetime.datetime.now(),
+                    }
+                },
+                upsert=True,
+            ),
+        )
+
+    async def flush(self):
+        await self.write_sink.flush()
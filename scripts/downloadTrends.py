@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import datetime
+from datetime import timedelta
+from typing import Dict, List
+
+from pymongo import UpdateOne
+
+from .bulkWriter import BulkWriteSink
+from .database import DATABASE_NAME, close_client, get_client
+from .downloadHistory import HISTORY_DAYS, REFETCH_DAYS, DownloadHistory
+from .httpClient import RateLimitedSession
+from .retryPolicy import RetryPolicy, UpstreamError, is_retryable
+
+try:
+    from .upstreamSchemas import decode_bulk_downloads_range, decode_downloads_range
+except ImportError:  # msgspec is missing; decode generic JSON
+    decode_bulk_downloads_range = decode_downloads_range = None
+
+try:
+    from .weeklyAggregation import summarize_daily_downloads
+except ImportError:  # numpy is missing; fall back to the per-package loop
+    summarize_daily_downloads = None
+
+# api.npmjs.org accepts up to 128 comma-separated packages per bulk query.
+# Scoped packages are not supported by bulk queries and need their own request.
+MAX_BULK_PACKAGES = 128
+
+
+def get_week_boundaries() -> tuple[datetime.datetime, datetime.datetime]:
+    """
+    Calculate the start and end dates for an 8-week period.
+    The period starts from the last completed Sunday and goes back 8 weeks.
+    """
+    today = datetime.datetime.now()
+    days_since_sunday = (today.weekday() + 1) % 7  # Days since last Sunday
+    last_sunday = today - timedelta(days=days_since_sunday)
+    start_date = last_sunday - timedelta(weeks=8)
+    return (
+        start_date.replace(hour=0, minute=0, second=0, microsecond=0),
+        last_sunday,
+    )
+
+
+def group_weekly_downloads(daily_downloads: List[Dict]) -> List[Dict]:
+    """
+    Sum daily downloads into Monday to Sunday weeks.
+    Weeks that do not have all 7 days are dropped.
+    """
+    downloads_by_week = []
+    current_week = []
+    current_week_start = None
+
+    for day_data in daily_downloads:
+        day_date = datetime.datetime.strptime(day_data["day"], "%Y-%m-%d")
+        # Start a new week on Monday
+        if day_date.weekday() == 0:
+            if current_week and len(current_week) == 7:
+                week_end = day_date - timedelta(days=1)  # Previous Sunday
+                downloads_by_week.append(
+                    {
+                        "week_ending": week_end.strftime("%Y-%m-%d"),
+                        "downloads": sum(current_week),
+                    }
+                )
+            current_week = []
+            current_week_start = day_date
+        current_week.append(day_data["downloads"])
+
+    # Add the last week if it's complete (7 days)
+    if current_week and len(current_week) == 7:
+        week_end = current_week_start + timedelta(days=6)
+        downloads_by_week.append(
+            {
+                "week_ending": week_end.strftime("%Y-%m-%d"),
+                "downloads": sum(current_week),
+            }
+        )
+
+    return downloads_by_week
+
+
+def compute_growth_metrics(weekly_trends: List[Dict]) -> Dict:
+    """
+    Growth fields stored with each package so the API can sort on an index.
+    Matches the API's former aggregation: the most recent week is left out,
+    week-over-week growth is a percentage and a week after a 0 week counts as 0.
+    """
+    full_weeks = [week["downloads"] for week in weekly_trends][:-1]
+    growth = [
+        0 if previous == 0 else (current - previous) / previous * 100
+        for previous, current in zip(full_weeks, full_weeks[1:])
+    ]
+    return {
+        "avgGrowth": sum(growth) / len(growth) if growth else 0,
+        "lastWeekGrowth": growth[-1] if growth else 0,
+        "weeklyDownloadDelta": (
+            full_weeks[-1] - full_weeks[-2] if len(full_weeks) > 1 else 0
+        ),
+    }
+
+
+def summarize_downloads(daily_series: List[List[Dict]]) -> List[Dict]:
+    """
+    Weekly trends and growth metrics for each package's daily downloads.
+    Returns one {"weekly_trends": [...], "growth": {...}} per series.
+    """
+    if summarize_daily_downloads is not None:
+        return summarize_daily_downloads(daily_series)
+    summaries = []
+    for daily_downloads in daily_series:
+        weekly_trends = group_weekly_downloads(daily_downloads)
+        summaries.append(
+            {
+                "weekly_trends": weekly_trends,
+                "growth": compute_growth_metrics(weekly_trends),
+            }
+        )
+    return summaries
+
+
+class DownloadTrendsFetcher:
+    """
+    Fetch weekly download trends for many packages at once.
+    Unscoped names are grouped into bulk range queries; scoped names fall back
+    to one request each. With stored download histories only the days after
+    each package's last stored day, and the last REFETCH_DAYS stored ones, are
+    requested. Failed range requests are
+    retried under `retry_policy`, since one failure covers a whole bulk group.
+    """
+
+    def __init__(
+        self,
+        downloads_url: str,
+        bulk_size: int = MAX_BULK_PACKAGES,
+        retry_policy: RetryPolicy | None = None,
+    ):
+        self.downloads_url = downloads_url
+        self.bulk_size = min(bulk_size, MAX_BULK_PACKAGES)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.total_requests = 0
+        self.days_requested = 0
+
+    def get_range_url(
+        self, names: List[str], start_date: datetime.date, end_date: datetime.date
+    ) -> str:
+        return (
+            f"{self.downloads_url}/range/"
+            f"{start_date.strftime('%Y-%m-%d')}:{end_date.strftime('%Y-%m-%d')}/"
+            f"{','.join(names)}"
+        )
+
+    async def fetch_range(
+        self,
+        session: RateLimitedSession,
+        names: List[str],
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ):
+        """Request a downloads range, raising UpstreamError unless it is a 200."""
+        self.total_requests += 1
+        self.days_requested += len(names) * ((end_date - start_date).days + 1)
+        url = self.get_range_url(names, start_date, end_date)
+        async with session.get(url) as response:
+            if response.status != 200:
+                raise UpstreamError.from_response(
+                    "Failed to fetch download stats", response
+                )
+            # A query with one name returns the single-package format
+            return await session.read_json(
+                response,
+                (
+                    decode_downloads_range
+                    if len(names) == 1
+                    else decode_bulk_downloads_range
+                ),
+            )
+
+    async def fetch_daily(
+        self,
+        session: RateLimitedSession,
+        names: List[str],
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> Dict[str, Dict]:
+        """
+        Fetch daily downloads of up to `bulk_size` packages for one date range.
+        Returns a dict mapping each name to {"downloads": [...], "error": None}
+        or {"error": "...", "retryable": bool}.
+        """
+        try:
+            range_data = await self.retry_policy.run(
+                lambda: self.fetch_range(session, names, start_date, end_date),
+                on_retry=lambda error, delay: session.record_retry(self.downloads_url),
+            )
+        except Exception as e:
+            error = {"error": str(e), "retryable": is_retryable(e)}
+            return {name: error for name in names}
+
+        if len(names) == 1:
+            # A query with one name returns the single-package format
+            range_data = {names[0]: range_data}
+        results = {}
+        for name in names:
+            download_data = range_data.get(name)
+            if not download_data:
+                results[name] = {
+                    "error": "No download stats returned",
+                    "retryable": False,
+                }
+            else:
+                results[name] = {
+                    "downloads": download_data.get("downloads", []),
+                    "error": None,
+                }
+        return results
+
+    async def fetch_single(
+        self, session: RateLimitedSession, package_name: str
+    ) -> Dict:
+        """Fetch weekly trends for one package, without using its history."""
+        start_date, end_date = (day.date() for day in get_week_boundaries())
+        daily = (await self.fetch_daily(session, [package_name], start_date, end_date))[
+            package_name
+        ]
+        if daily["error"]:
+            return daily
+        [summary] = summarize_downloads([daily["downloads"]])
+        return {**summary, "error": None}
+
+    async def fetch_trends(
+        self,
+        session: RateLimitedSession,
+        package_names: List[str],
+        histories: Dict[str, DownloadHistory] | None = None,
+    ) -> Dict[str, Dict]:
+        """
+        Fetch weekly trends for all given packages.
+        `histories` holds the stored download history of the packages that have
+        one; only the missing days and the last REFETCH_DAYS stored ones are
+        fetched and merged into it.
+        Returns a dict mapping each name to {"weekly_trends": [...],
+        "growth": {...}, "history": DownloadHistory or None, "error": None} or
+        {"error": "...", "retryable": bool}. "history" is only set when it gained
+        new days.
+        """
+        histories = histories or {}
+        start_date, end_date = (day.date() for day in get_week_boundaries())
+        first_kept_day = end_date - timedelta(days=HISTORY_DAYS - 1)
+
+        # A bulk query covers one date range, so group names by their first
+        # day to fetch (after a normal weekly run they all share the same one)
+        names_by_start: Dict[datetime.date, List[str]] = {}
+        for name in package_names:
+            history = histories.get(name)
+            if history is None or history.end is None:
+                fetch_start = start_date
+            elif history.end >= end_date:
+                continue  # Already up to date
+            else:
+                # Refetch the latest stored days too, in case they were incomplete
+                fetch_start = max(
+                    history.end - timedelta(days=REFETCH_DAYS - 1), first_kept_day
+                )
+            names_by_start.setdefault(fetch_start, []).append(name)
+
+        tasks = []
+        for fetch_start, names in names_by_start.items():
+            unscoped = [name for name in names if not name.startswith("@")]
+            tasks.extend(
+                self.fetch_daily(
+                    session, unscoped[i : i + self.bulk_size], fetch_start, end_date
+                )
+                for i in range(0, len(unscoped), self.bulk_size)
+            )
+            tasks.extend(
+                self.fetch_daily(session, [name], fetch_start, end_date)
+                for name in names
+                if name.startswith("@")
+            )
+        fetched = {}
+        for chunk_results in await asyncio.gather(*tasks):
+            fetched.update(chunk_results)
+
+        results = {}
+        known_histories = {}
+        updated_names = set()
+        for name in package_names:
+            history = histories.get(name)
+            daily = fetched.get(name)
+            if daily is not None:
+                if daily["error"]:
+                    results[name] = daily
+                    continue
+                history = history or DownloadHistory()
+                history.extend(daily["downloads"])
+                history.trim(first_kept_day)
+                updated_names.add(name)
+            known_histories[name] = history
+
+        # Aggregate the whole chunk together
+        summaries = summarize_downloads(
+            [
+                history.daily_downloads(start_date, end_date)
+                for history in known_histories.values()
+            ]
+        )
+        for (name, history), summary in zip(known_histories.items(), summaries):
+            results[name] = {
+                **summary,
+                "history": history if name in updated_names else None,
+                "error": None,
+            }
+        return results
+
+
+async def backfill_growth(batch_size: int = 500):
+    """
+    Compute the growth fields from the stored weekly trends of every package
+    that does not have them yet, instead of waiting for its next refresh.
+    """
+    client = get_client()
+    collection = client[DATABASE_NAME]["packages"]
+    failed = []
+    write_sink = BulkWriteSink(
+        collection,
+        lambda name, error: failed.append(name),
+        max_batch_size=batch_size,
+    )
+    count = 0
+    async for doc in collection.find(
+        {"avgGrowth": {"$exists": False}}, {"name": 1, "downloads.weekly_trends": 1}
+    ):
+        weekly_trends = (doc.get("downloads") or {}).get("weekly_trends") or []
+        await write_sink.add(
+            doc["name"],
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": compute_growth_metrics(weekly_trends)},
+            ),
+        )
+        count += 1
+    await write_sink.flush()
+    print(f"Stored growth metrics of {count} packages ({len(failed)} failed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Weekly download trends")
+    parser.add_argument(
+        "--backfill-growth",
+        action="store_true",
+        help="Store growth metrics for packages stored before they were computed",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    if not args.backfill_growth:
+        parser.print_help()
+        return
+
+    async def run():
+        try:
+            await backfill_growth(args.batch_size)
+        finally:
+            await close_client()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,61 +3,162 @@ import asyncio
 import json
 import time
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 import aiohttp
 
+from .httpClient import RateLimitedSession
+from .metrics import MetricsRegistry
+from .retryPolicy import RetryPolicy, UpstreamError
+
+# Page size of the ecosyste.ms package_names endpoint as we request it
+PACKAGES_PER_PAGE = 1000
+
+
+def load_package_names(path: str) -> List[str]:
+    """
+    Load a ranked package list: NDJSON page records written by
+    TopPackagesFetcher, or a plain JSON list.
+    """
+    if not path.endswith(".ndjson"):
+        with open(path, "r") as f:
+            return json.load(f)
+    pages = {}
+    with open(path, "r") as f:
+        for line in f:
+            record = json.loads(line)
+            pages[record["page"]] = record.get("names", [])
+    return [name for page in sorted(pages) for name in pages[page]]
+
+
+def rank_names(names: List[str], first_rank: int = 0) -> Dict[str, int]:
+    """Map each name of a gapless ranked list to its 0-based rank."""
+    return {name: rank for rank, name in enumerate(names, start=first_rank)}
+
+
+def load_ranking(path: str) -> Dict[str, int]:
+    """
+    Load a package list as name -> absolute 0-based rank. Names in NDJSON
+    page records are ranked by their page, so a missing page leaves a gap
+    instead of moving every later name up.
+    """
+    if not path.endswith(".ndjson"):
+        return rank_names(load_package_names(path))
+    ranks = {}
+    with open(path, "r") as f:
+        for line in f:
+            record = json.loads(line)
+            per_page = record.get("per_page", PACKAGES_PER_PAGE)
+            ranks.update(
+                rank_names(record.get("names", []), (record["page"] - 1) * per_page)
+            )
+    return ranks
+
+
+def diff_rankings(
+    previous: Dict[str, int], current: Dict[str, int], complete: bool = True
+) -> Dict:
+    """
+    Compare two rankings given as name -> absolute rank (see rank_names and
+    load_ranking).
+    Returns the names that entered, the names that left and
+    (name, previous rank, current rank) for the names that moved. With an
+    incomplete current ranking, a name missing from it may just be on a
+    missing page, so "left" is None.
+    """
+    return {
+        "entered": [name for name in current if name not in previous],
+        "left": (
+            [name for name in previous if name not in current] if complete else None
+        ),
+        "moved": [
+            (name, previous[name], rank)
+            for name, rank in current.items()
+            if name in previous and previous[name] != rank
+        ],
+    }
+
+
+def print_ranking_diff(diff: Dict, top_movers: int = 10):
+    print("\n=== Ranking Changes ===")
+    print(f"Entered: {len(diff['entered'])}")
+    if diff["left"] is None:
+        print("Left: unknown (some pages are missing)")
+    else:
+        print(f"Left: {len(diff['left'])}")
+    print(f"Moved: {len(diff['moved'])}")
+    movers = sorted(diff["moved"], key=lambda move: abs(move[1] - move[2]))
+    for name, previous_rank, rank in reversed(movers[-top_movers:]):
+        print(f"  {name}: #{previous_rank + 1} -> #{rank + 1}")
+
 
 class TopPackagesFetcher:
+    """
+    Fetch the most downloaded package names from ecosyste.ms, `depth` names
+    deep. Pages are appended to an NDJSON file as they arrive (one
+    {"page", "names"} record each, in arrival order); pages that still fail
+    after retries are recorded as {"page", "missing": true} and listed in
+    `missing_pages`. `ranks` maps every fetched name to its absolute rank.
+    """
+
     def __init__(
-        self, skip: int = 0, output_file: str = "data/package_names_default.json"
+        self,
+        skip: int = 0,
+        output_file: str = "data/package_names_default.ndjson",
+        depth: int = 20000,
     ):
         self.base_url = (
             "https://packages.ecosyste.ms/api/v1/registries/npmjs.org/package_names"
         )
-        self.packages_per_page = 1000
-        self.total_pages = 20  # Number of pages to fetch after the skip (10k packages)
+        self.packages_per_page = PACKAGES_PER_PAGE
+        # Number of pages to fetch after the skip
+        self.total_pages = -(-depth // self.packages_per_page)
         self.output_file = output_file
         self.skip = skip
-        self.semaphore = asyncio.Semaphore(10)  # Limit concurrent requests
-        self.max_retries = 5  # Maximum number of retries per page
-        self.retry_delay = 10  # Delay in seconds between retries
-
-    async def fetch_page(self, session: aiohttp.ClientSession, page: int) -> List[str]:
-        """Fetch a single page of package names with retries."""
-        attempt = 0
-        while attempt < self.max_retries:
-            try:
-                async with self.semaphore:
-                    params = {
-                        "per_page": self.packages_per_page,
-                        "sort": "downloads",
-                        "page": page,
-                    }
-                    async with session.get(self.base_url, params=params) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            print(f"Successfully fetched page {page}")
-                            return data
-                        else:
-                            print(
-                                f"Error fetching page {page}: Status {response.status}"
-                            )
-            except Exception as e:
-                print(f"Exception fetching page {page}: {str(e)}")
-            attempt += 1
-            print(
-                f"Retrying page {page} (attempt {attempt + 1}/{self.max_retries}) in {self.retry_delay} seconds..."
-            )
-            await asyncio.sleep(self.retry_delay)
-        print(f"Failed to fetch page {page} after {self.max_retries} attempts.")
-        return []
+        self.retry_policy = RetryPolicy(max_attempts=5, base_delay=2.0, max_delay=60.0)
+        self.missing_pages: List[int] = []
+        self.ranks: Dict[str, int] = {}
+        self.metrics = MetricsRegistry()
+        self.metrics_dir = Path("data/metrics")
+
+    async def fetch_page(
+        self, session: RateLimitedSession, page: int
+    ) -> List[str] | None:
+        """Fetch a single page of package names with retries (None if it failed)."""
+        params = {
+            "per_page": self.packages_per_page,
+            "sort": "downloads",
+            "page": page,
+        }
+
+        async def request_page():
+            async with session.get(self.base_url, params=params) as response:
+                if response.status != 200:
+                    raise UpstreamError.from_response(
+                        f"Error fetching page {page}", response
+                    )
+                return await session.read_json(response)
+
+        def on_retry(error: BaseException, delay: float):
+            session.record_retry(self.base_url)
+            print(f"{error}; retrying page {page} in {delay:.1f} seconds...")
+
+        try:
+            data = await self.retry_policy.run(request_page, on_retry=on_retry)
+        except Exception as e:
+            print(f"Failed to fetch page {page}: {e}")
+            return None
+        print(f"Successfully fetched page {page}")
+        return data
+
+    async def fetch_numbered_page(self, session: RateLimitedSession, page: int):
+        return page, await self.fetch_page(session, page)
 
     async def fetch_all_packages(self) -> List[str]:
         """
-        Fetch 10k packages after skipping a specified number.
-        The starting page is computed as (skip // packages_per_page) + 1,
-        and then 10 full pages are fetched from that starting page.
+        Fetch `depth` package names after skipping a specified number.
+        The starting page is computed as (skip // packages_per_page) + 1.
+        Returns the names in rank order; names on missing pages are absent.
         """
         start_page = (self.skip // self.packages_per_page) + 1
         end_page = start_page + self.total_pages - 1
@@ -65,25 +166,44 @@ class TopPackagesFetcher:
             f"Skipping pages 1 to {start_page - 1}. Fetching pages {start_page} to {end_page}."
         )
 
-        pages_to_fetch = range(start_page, start_page + self.total_pages)
-        async with aiohttp.ClientSession() as session:
-            tasks = [self.fetch_page(session, page) for page in pages_to_fetch]
-            results = await asyncio.gather(*tasks)
-
-        # Flatten the results from all pages
-        all_packages = []
-        for page_results in results:
-            if page_results:
-                all_packages.extend(page_results)
-        return all_packages
-
-    def save_packages(self, packages: List[str]):
-        """Save packages to JSON file."""
         output_path = Path(self.output_file)
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, "w") as f:
-            json.dump(packages, f, indent=2)
-        print(f"\nSaved {len(packages)} packages to {self.output_file}")
+        self.missing_pages = []
+        pages = {}
+        async with aiohttp.ClientSession() as client_session:
+            # packages.ecosyste.ms gets its own adaptive concurrency limit
+            session = RateLimitedSession(client_session, metrics=self.metrics)
+            tasks = [
+                self.fetch_numbered_page(session, page)
+                for page in range(start_page, end_page + 1)
+            ]
+            with open(output_path, "w") as f:
+                for next_page in asyncio.as_completed(tasks):
+                    page, names = await next_page
+                    if names is None:
+                        self.missing_pages.append(page)
+                        record = {"page": page, "missing": True}
+                    else:
+                        pages[page] = names
+                        record = {
+                            "page": page,
+                            "per_page": self.packages_per_page,
+                            "names": names,
+                        }
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    f.flush()
+
+        self.missing_pages.sort()
+        self.ranks = {}
+        for page in sorted(pages):
+            first_rank = (page - 1) * self.packages_per_page
+            self.ranks.update(rank_names(pages[page], first_rank))
+        if self.missing_pages:
+            print(f"Missing pages: {self.missing_pages}")
+        print(f"Saved {sum(map(len, pages.values()))} packages to {self.output_file}")
+        self.metrics.inc("run_packages_total", sum(map(len, pages.values())))
+        self.metrics.save(self.metrics_dir, "discovery")
+        return [name for page in sorted(pages) for name in pages[page]]
 
 
 async def main():
@@ -94,23 +214,52 @@ async def main():
         default=0,
         help="Number of packages to skip (for resuming a previous run)",
     )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=20000,
+        help="Number of package names to fetch after the skip",
+    )
     parser.add_argument(
         "--output",
         type=str,
-        default="data/package_names.json",
-        help="File location to store the package data",
+        default="data/package_names.ndjson",
+        help="File location to store the package data (NDJSON page records)",
+    )
+    parser.add_argument(
+        "--previous",
+        type=str,
+        default=None,
+        help="Earlier package list (.ndjson or .json) to diff the new ranking against",
+    )
+    parser.add_argument(
+        "--diff-output",
+        type=str,
+        default="data/ranking_diff.json",
+        help="File location to store the ranking diff (with --previous)",
     )
     args = parser.parse_args()
 
     start_time = time.time()
-    fetcher = TopPackagesFetcher(skip=args.skip, output_file=args.output)
+    fetcher = TopPackagesFetcher(
+        skip=args.skip, output_file=args.output, depth=args.depth
+    )
     print("Fetching top packages by downloads...")
 
     packages = await fetcher.fetch_all_packages()
 
     if packages:
-        fetcher.save_packages(packages)
         print(f"\nTotal packages fetched: {len(packages)}")
+        if args.previous:
+            diff = diff_rankings(
+                load_ranking(args.previous),
+                fetcher.ranks,
+                complete=not fetcher.missing_pages,
+            )
+            print_ranking_diff(diff)
+            with open(args.diff_output, "w") as f:
+                json.dump(diff, f)
+            print(f"Ranking diff saved to {args.diff_output}")
     else:
         print("\nFailed to fetch packages")
 
@@ -0,0 +1,220 @@
+import asyncio
+import email.utils
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .metrics import MetricsRegistry
+
+# Starting point and bounds of the concurrency limit per upstream host.
+# Hosts not listed here (e.g. a local stand-in server) use DEFAULT_HOST_LIMITS.
+HOST_LIMITS = {
+    "registry.npmjs.org": {"initial_limit": 10, "max_limit": 64},
+    "api.npmjs.org": {"initial_limit": 4, "max_limit": 16},
+    "packages.ecosyste.ms": {"initial_limit": 5, "max_limit": 20},
+}
+DEFAULT_HOST_LIMITS = {"initial_limit": 10, "max_limit": 50}
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class AdaptiveHostLimiter:
+    """
+    AIMD concurrency limit for a single upstream host.
+
+    Every fast successful response grows the limit by 1/limit (about +1 per
+    round of requests). A throttling response halves it and honours Retry-After;
+    a response slower than `target_latency` shrinks it by 10%. Decreases are
+    applied at most once per `decrease_interval`, so a burst of 429s from one
+    round of requests only counts once.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 50,
+        target_latency: float = 2.0,
+        decrease_interval: float = 1.0,
+    ):
+        self.host = host
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency  # Seconds until response headers
+        self.decrease_interval = decrease_interval
+        self.last_decrease = 0.0
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.condition = asyncio.Condition()
+
+        self.total_requests = 0
+        self.throttled_count = 0
+
+    async def acquire(self):
+        """Wait for a free slot and for any Retry-After pause to end."""
+        async with self.condition:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    # Wake up when the pause ends, or earlier if notified
+                    try:
+                        await asyncio.wait_for(self.condition.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    self.total_requests += 1
+                    return
+                await self.condition.wait()
+
+    def decrease(self, factor: float):
+        now = time.monotonic()
+        if now - self.last_decrease >= self.decrease_interval:
+            self.limit = max(self.min_limit, self.limit * factor)
+            self.last_decrease = now
+
+    async def release(
+        self, status: int | None, latency: float, retry_after: float | None = None
+    ):
+        """Free the slot and adapt the limit to the response we got."""
+        async with self.condition:
+            self.in_flight -= 1
+            if status in THROTTLE_STATUSES:
+                self.throttled_count += 1
+                self.decrease(0.5)
+                if retry_after:
+                    self.paused_until = max(
+                        self.paused_until, time.monotonic() + retry_after
+                    )
+            elif status is None or latency > self.target_latency:
+                # Connection errors and slow responses both mean back off a bit
+                self.decrease(0.9)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+class RateLimitedSession:
+    """
+    Wrap an aiohttp session so every request goes through its host's limiter.
+    Exposes the same `get` context manager interface as aiohttp.ClientSession,
+    and records latency, status and body size of every request in `metrics`.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        host_limits: Dict[str, Dict] | None = None,
+        metrics: MetricsRegistry | None = None,
+    ):
+        self.session = session
+        self.host_limits = HOST_LIMITS if host_limits is None else host_limits
+        self.limiters: Dict[str, AdaptiveHostLimiter] = {}
+        self.metrics = metrics or MetricsRegistry()
+
+    def get_limiter(self, url: str) -> AdaptiveHostLimiter:
+        host = urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = AdaptiveHostLimiter(
+                host, **self.host_limits.get(host, DEFAULT_HOST_LIMITS)
+            )
+        return self.limiters[host]
+
+    @asynccontextmanager
+    async def get(self, url: str, **kwargs):
+        limiter = self.get_limiter(url)
+        wait_start = time.monotonic()
+        await limiter.acquire()
+        start = time.monotonic()
+        self.metrics.observe(
+            "http_limiter_wait_seconds", start - wait_start, host=limiter.host
+        )
+        response = status = latency = retry_after = None
+        try:
+            async with self.session.get(url, **kwargs) as response:
+                status = response.status
+                latency = time.monotonic() - start
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                yield response
+        finally:
+            if latency is None:
+                latency = time.monotonic() - start
+            await limiter.release(status, latency, retry_after)
+            self.record_response(limiter.host, response, status, latency)
+
+    def record_response(
+        self,
+        host: str,
+        response: aiohttp.ClientResponse | None,
+        status: int | None,
+        latency: float,
+    ):
+        self.metrics.observe("http_request_duration_seconds", latency, host=host)
+        self.metrics.inc(
+            "http_responses_total",
+            host=host,
+            status="error" if status is None else str(status),
+        )
+        if response is not None:
+            self.metrics.inc(
+                "http_response_bytes_total", response.content.total_bytes, host=host
+            )
+
+    def record_retry(self, url: str):
+        self.metrics.inc("http_retries_total", host=urlsplit(url).netloc)
+
+    async def read_json(
+        self,
+        response: aiohttp.ClientResponse,
+        decode: Callable[[bytes], Any] | None = None,
+    ):
+        """
+        Read a response body and decode it, timing the decode. `decode` is a
+        schema-aware decoder; the default builds generic JSON values.
+        """
+        body = await response.read()
+        with self.metrics.timer(
+            "json_decode_seconds", host=urlsplit(str(response.url)).netloc
+        ):
+            return (decode or json.loads)(body)
+
+    def get_pause_remaining(self) -> float:
+        """Seconds until every host's Retry-After pause has ended."""
+        now = time.monotonic()
+        return max(
+            (limiter.paused_until - now for limiter in self.limiters.values()),
+            default=0.0,
+        )
+
+    def print_summary(self):
+        """Print the final limit and throttling count per host."""
+        print("\n=== Per-host Rate Limits ===")
+        for host, limiter in sorted(self.limiters.items()):
+            print(
+                f"{host}: {limiter.total_requests} requests, "
+                f"{limiter.throttled_count} throttled, "
+                f"final concurrency limit {limiter.limit:.1f}"
+            )
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, AsyncMongoClient, IndexModel
+from pymongo.errors import OperationFailure
+
+from .database import DATABASE_NAME, close_client, get_client
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Indexes every collection should have, declared in one place.
+# The API sorts and filters on the packages fields; the ingester upserts by name.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "packages": [
+        IndexModel([("name", ASCENDING)], name="name_unique", unique=True),
+        IndexModel([("downloads.total", DESCENDING)], name="downloads_total"),
+        IndexModel([("dependent_repos_count", DESCENDING)], name="dependent_repos"),
+        IndexModel(
+            [("npm_timestamps.modified_at", DESCENDING)], name="npm_modified_at"
+        ),
+        # Multikey index for exact keyword filtering
+        IndexModel([("keywords_normalized", ASCENDING)], name="keywords_normalized"),
+        # Precomputed growth metrics
+        IndexModel([("avgGrowth", DESCENDING)], name="avg_growth"),
+        IndexModel([("lastWeekGrowth", DESCENDING)], name="last_week_growth"),
+        IndexModel([("weeklyDownloadDelta", DESCENDING)], name="weekly_delta"),
+    ],
+    "download_history": [
+        IndexModel([("name", ASCENDING)], name="name_unique", unique=True),
+    ],
+    # Reverse-dependency edges: dependents of a name, edges of a dependent
+    "dependents": [
+        IndexModel(
+            [("dependency", ASCENDING), ("dependent", ASCENDING)],
+            name="dependency_dependent_unique",
+            unique=True,
+        ),
+        IndexModel([("dependent", ASCENDING)], name="dependent"),
+    ],
+}
+
+# Last-update field of each collection keyed by a unique name; `--dedupe` keeps
+# the most recently updated document of every name
+UPDATED_AT_FIELDS = {
+    "packages": "db_updated_at",
+    "download_history": "updated_at",
+}
+
+
+class IndexManager:
+    """
+    Create the declared indexes. Safe to run before every update: indexes that
+    already exist with the same definition are left alone. A unique index that
+    cannot be built because of duplicates fails the run; removing them is an
+    explicit step (`python -m scripts.indexManager --dedupe <collection>`).
+    """
+
+    def __init__(self, client: AsyncMongoClient | None = None):
+        self.client = client or get_client()
+        self.db = self.client[DATABASE_NAME]
+
+    async def remove_duplicate_names(
+        self, collection_name: str, dry_run: bool = False
+    ) -> int:
+        """
+        Keep one document per name (the most recently updated) so the unique
+        name index can be built. Returns the number of documents removed, or
+        that would be removed with `dry_run`.
+        """
+        collection = self.db[collection_name]
+        cursor = await collection.aggregate(
+            [
+                {"$sort": {UPDATED_AT_FIELDS[collection_name]: -1}},
+                {"$group": {"_id": "$name", "ids": {"$push": "$_id"}}},
+                {"$match": {"ids.1": {"$exists": True}}},
+            ],
+            allowDiskUse=True,
+        )
+        duplicate_ids = [
+            duplicate_id async for group in cursor for duplicate_id in group["ids"][1:]
+        ]
+        if duplicate_ids and not dry_run:
+            await collection.delete_many({"_id": {"$in": duplicate_ids}})
+        return len(duplicate_ids)
+
+    async def ensure_collection_indexes(
+        self, collection_name: str, indexes: List[IndexModel]
+    ):
+        collection = self.db[collection_name]
+        try:
+            await collection.create_indexes(indexes)
+        except OperationFailure as e:
+            if e.code != DUPLICATE_KEY_ERROR:
+                raise
+            hint = ""
+            if collection_name in UPDATED_AT_FIELDS:
+                hint = (
+                    "; to keep the most recently updated document of each name, "
+                    f"run: python -m scripts.indexManager --dedupe {collection_name}"
+                )
+            raise Exception(
+                f"Cannot build the unique indexes of {collection_name}: "
+                f"it holds duplicate documents{hint}"
+            ) from e
+
+    async def ensure_indexes(self):
+        for collection_name, indexes in INDEXES.items():
+            await self.ensure_collection_indexes(collection_name, indexes)
+            print(f"Indexes ensured for {collection_name}: {len(indexes)}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Create the declared MongoDB indexes")
+    parser.add_argument(
+        "--dedupe",
+        choices=sorted(UPDATED_AT_FIELDS),
+        default=None,
+        help="First delete all but the most recently updated document of each "
+        "name in this collection",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With --dedupe, only count the documents that would be deleted",
+    )
+    args = parser.parse_args()
+
+    try:
+        manager = IndexManager()
+        if args.dedupe:
+            removed = await manager.remove_duplicate_names(args.dedupe, args.dry_run)
+            verb = "Would remove" if args.dry_run else "Removed"
+            print(f"{verb} {removed} duplicate documents from {args.dedupe}")
+            if args.dry_run:
+                return
+        await manager.ensure_indexes()
+    finally:
+        await close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import re
+from typing import List
+
+from pymongo import UpdateOne
+
+from .bulkWriter import BulkWriteSink
+from .database import DATABASE_NAME, close_client, get_client
+
+# Old packuments sometimes store keywords as one string ("cli, tool")
+_KEYWORD_SEPARATORS = re.compile(r"[\s,]+")
+
+# What JavaScript's String.prototype.trim removes. str.strip() differs: it
+# also strips \x1c-\x1f and \x85 but keeps the byte order mark
+_JS_WHITESPACE = (
+    "\t\n\v\f\r \xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006"
+    "\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+)
+
+
+def normalize_keyword(keyword: str) -> str:
+    """
+    Lowercase, trim and drop one trailing "s" so singular and plural forms
+    match. Must stay in sync with normalizeKeyword in lib/keywords.ts.
+    """
+    keyword = keyword.strip(_JS_WHITESPACE).lower()
+    if len(keyword) > 1 and keyword.endswith("s"):
+        keyword = keyword[:-1]
+    return keyword
+
+
+def normalize_keywords(keywords) -> List[str]:
+    """Normalized, deduplicated keywords in their original order."""
+    if isinstance(keywords, str):
+        keywords = _KEYWORD_SEPARATORS.split(keywords)
+    if not isinstance(keywords, list):
+        return []
+    normalized = []
+    for keyword in keywords:
+        if isinstance(keyword, str):
+            keyword = normalize_keyword(keyword)
+            if keyword and keyword not in normalized:
+                normalized.append(keyword)
+    return normalized
+
+
+async def backfill(batch_size: int = 500):
+    """Recompute keywords_normalized for every stored package."""
+    client = get_client()
+    collection = client[DATABASE_NAME]["packages"]
+    failed = []
+    write_sink = BulkWriteSink(
+        collection,
+        lambda name, error: failed.append(name),
+        max_batch_size=batch_size,
+    )
+    count = 0
+    async for doc in collection.find({}, {"name": 1, "keywords": 1}):
+        await write_sink.add(
+            doc["name"],
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "keywords_normalized": normalize_keywords(doc.get("keywords"))
+                    }
+                },
+            ),
+        )
+        count += 1
+    await write_sink.flush()
+    print(f"Normalized keywords of {count} packages ({len(failed)} failed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalized package keywords")
+    parser.add_argument(
+        "--backfill",
+        action="store_true",
+        help="Re-normalize the keywords of every stored package",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.print_help()
+        return
+
+    async def run():
+        try:
+            await backfill(args.batch_size)
+        finally:
+            await close_client()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
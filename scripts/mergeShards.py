@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import datetime
+import json
+from pathlib import Path
+
+from .changesFeed import seq_number
+from .database import close_client, get_client
+from .syncMetadata import SyncMetadata
+
+
+class ShardMerger:
+    """
+    Finish a sharded weekly run once every shard has reported back.
+
+    Each shard (`weekly_update --shard i/N`) leaves its changes feed position,
+    the changed packages it could not refresh and its failures in its own run
+    journal. The merge combines them, records the changes feed state, the top
+    package ranking and the last sync date once, and clears the shard journals.
+    """
+
+    def __init__(self, shard_count: int, client=None):
+        self.shard_count = shard_count
+        self.client = client or get_client()
+        self.log_dir = Path("data/logs")
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+
+    def get_shard_syncs(self):
+        return [
+            SyncMetadata(client=self.client, shard=(index, self.shard_count))
+            for index in range(self.shard_count)
+        ]
+
+    def save_failed_packages_log(self, failed_packages):
+        """Save the failures of all shards to one log file."""
+        if failed_packages:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            log_file = self.log_dir / f"failed_packages_{timestamp}.log"
+            with open(log_file, "w") as f:
+                json.dump(failed_packages, f, indent=2)
+            print(f"Failed packages log saved to: {log_file}")
+
+    async def merge(self) -> bool:
+        """
+        Merge the shard results. Returns False, without changing anything, if
+        some shard has not finished yet.
+        """
+        shard_syncs = self.get_shard_syncs()
+        runs = [await sync.get_current_run() for sync in shard_syncs]
+        unfinished = [
+            f"{index}/{self.shard_count}"
+            for index, run in enumerate(runs)
+            if not run or run.get("phase") != "done"
+        ]
+        if unfinished:
+            print(f"Shards not finished: {', '.join(unfinished)}")
+            return False
+
+        failed_packages = []
+        pending_names = set()
+        for run in runs:
+            failed_packages.extend(run.get("failed_packages", []))
+            pending_names.update(run.get("pending_changed_names", []))
+        self.save_failed_packages_log(failed_packages)
+
+        # Shards may have read the feed up to different points; resuming from
+        # the earliest one can only repeat changes, never miss them. A shard
+        # that could not read the feed leaves the stored state as it was.
+        seqs = [run.get("changes_seq") for run in runs]
+        sync = SyncMetadata(client=self.client)
+        if None in seqs:
+            print("A shard could not read the changes feed; its state is kept")
+        else:
+            await sync.update_changes_feed_state(
+                min(seqs, key=seq_number), list(pending_names)
+            )
+
+        print("\n=== Shard Merge Summary ===")
+        print(f"Shards merged: {self.shard_count}")
+        print(f"Failed packages: {len(failed_packages)}")
+        print(f"Changed packages left for the next run: {len(pending_names)}")
+
+        # Every shard fetched the ranking; keep the first complete one
+        complete_rankings = [
+            run["top_names"]
+            for run in runs
+            if run.get("top_names") and not run.get("missing_pages")
+        ]
+        if complete_rankings:
+            await sync.update_top_ranking(complete_rankings[0])
+        await sync.update_last_sync()
+        for shard_sync in shard_syncs:
+            await shard_sync.finish_run()
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Combine the results of a sharded weekly update"
+    )
+    parser.add_argument(
+        "--shards", type=int, required=True, help="Number of shards the run used"
+    )
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            return await ShardMerger(args.shards).merge()
+        finally:
+            await close_client()
+
+    if not asyncio.run(run()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import bisect
+import datetime
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+METRIC_PREFIX = "npm_leaderboard_"
+
+# Upper bounds of the histogram buckets, in seconds unless listed in METRIC_BUCKETS
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRIC_BUCKETS = {
+    "queue_depth": (0, 1, 2, 5, 10, 20, 50, 100, 200),
+}
+
+METRIC_HELP = {
+    "http_request_duration_seconds": "Time until response headers, per host",
+    "http_limiter_wait_seconds": "Time spent waiting for a host's concurrency limit",
+    "http_responses_total": "Responses per host and status (error: no response)",
+    "http_retries_total": "Requests retried after a failed attempt, per host",
+    "http_response_bytes_total": "Decoded response body bytes read, per host",
+    "json_decode_seconds": "Time decoding fully read JSON bodies, per host",
+    "packument_parse_seconds": "Time streaming and parsing packuments, body read included",
+    "mongo_write_seconds": "Duration of each bulk_write, per collection",
+    "mongo_write_operations_total": "Operations sent in bulk_writes, per collection",
+    "queue_depth": "Worker queue length each time a worker takes an item",
+    "run_packages_total": "Packages handled by the run, per result",
+    "run_duration_seconds": "Wall-clock duration of the run",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the quantile (the maximum past the last one)."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def cumulative_counts(self):
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.bucket_counts):
+            seen += count
+            yield bound, seen
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{key}="{escape_label_value(value)}"' for key, value in pairs)
+        + "}"
+    )
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms for one run, keyed by name and labels.
+
+    At the end of a run `save` writes a timestamped JSON summary and a
+    Prometheus textfile (for node_exporter's textfile collector) that is
+    replaced on every run.
+    """
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: str):
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(
+                METRIC_BUCKETS.get(name, LATENCY_BUCKETS)
+            )
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str):
+        """Observe the duration of the block in the `name` histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def to_dict(self) -> Dict:
+        """JSON-friendly summary: every series as {"labels", "value"} per metric."""
+        summary = {}
+        for series, render in (
+            (self.counters, lambda value: value),
+            (self.gauges, lambda value: value),
+            (self.histograms, Histogram.to_dict),
+        ):
+            for (name, labels), value in sorted(series.items()):
+                summary.setdefault(name, []).append(
+                    {"labels": dict(labels), "value": render(value)}
+                )
+        return summary
+
+    def to_prometheus(self) -> str:
+        lines = []
+        described = set()
+
+        def describe(name: str, metric_type: str):
+            if name not in described:
+                described.add(name)
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} {metric_type}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            describe(name, "counter")
+            lines.append(
+                f"{METRIC_PREFIX}{name}{format_labels(labels)} {format_value(value)}"
+            )
+        for (name, labels), value in sorted(self.gauges.items()):
+            describe(name, "gauge")
+            lines.append(
+                f"{METRIC_PREFIX}{name}{format_labels(labels)} {format_value(value)}"
+            )
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            describe(name, "histogram")
+            metric = f"{METRIC_PREFIX}{name}"
+            for bound, count in histogram.cumulative_counts():
+                bucket_labels = format_labels(labels, le=format_value(bound))
+                lines.append(f"{metric}_bucket{bucket_labels} {count}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {histogram.sum!r}")
+            lines.append(f"{metric}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, directory: str | Path, run_name: str) -> Path:
+        """
+        Write `{run_name}_{timestamp}.json` and `{run_name}.prom` to `directory`.
+        The textfile is written to a temporary file first and renamed, so the
+        collector never reads a partial file.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        json_path = directory / f"{run_name}_{timestamp}.json"
+        with open(json_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+
+        prom_path = directory / f"{run_name}.prom"
+        temp_path = prom_path.with_suffix(".prom.tmp")
+        with open(temp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, prom_path)
+        print(f"Metrics saved to: {json_path} and {prom_path}")
+        return json_path
+
+    def print_summary(self):
+        """Per-host request latency and time, to see which upstream bounds the run."""
+        print("\n=== Upstream Metrics ===")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if name != "http_request_duration_seconds":
+                continue
+            host = dict(labels)["host"]
+            wait = self.histograms.get(("http_limiter_wait_seconds", labels))
+            response_bytes = self.counters.get(("http_response_bytes_total", labels), 0)
+            retries = self.counters.get(("http_retries_total", labels), 0)
+            print(
+                f"{host}: {histogram.count} requests, "
+                f"p50 <= {histogram.quantile(0.5)}s, "
+                f"p99 <= {histogram.quantile(0.99)}s, "
+                f"{histogram.sum:.0f}s waiting on responses, "
+                f"{wait.sum if wait else 0:.0f}s queued for the host limit, "
+                f"{response_bytes / 1024 / 1024:.1f}MB, {retries:.0f} retries"
+            )
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if name == "mongo_write_seconds":
+                print(
+                    f"MongoDB {dict(labels)['collection']}: "
+                    f"{histogram.count} bulk writes, {histogram.sum:.1f}s, "
+                    f"p99 <= {histogram.quantile(0.99)}s"
+                )
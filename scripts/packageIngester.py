@@ -0,0 +1,767 @@
+import argparse
+import asyncio
+import datetime
+import json
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, List
+
+import aiohttp
+from pymongo import AsyncMongoClient, UpdateOne
+
+from .bulkWriter import BulkWriteSink
+from .changesFeed import RegistryChangesFeed
+from .conditionalRequests import get_conditional_headers, get_registry_validators
+from .database import DATABASE_NAME, close_client, get_client
+from .downloadHistory import DownloadHistoryStore
+from .downloadTrends import DownloadTrendsFetcher
+from .fetchPackagesWithInfo import load_package_names
+from .httpClient import RateLimitedSession
+from .keywords import normalize_keywords
+from .metrics import MetricsRegistry
+from .packumentParser import OFFLOAD_PACKUMENT_BYTES, parse_packument_response
+from .refreshScheduler import RefreshScheduler
+from .retryPolicy import RetryPolicy, UpstreamError, is_retryable
+from .reverseDependencies import ReverseDependencyIndex
+from .sharding import format_shard, in_shard, parse_shard
+from .statsCache import EcosystemStatsCache
+from .syncMetadata import SyncMetadata
+from .workerPool import run_worker_pool
+
+try:
+    from .upstreamSchemas import decode_ecosystem_stats, validate_package_update
+except ImportError:  # msgspec is missing; decode generic JSON, skip validation
+    decode_ecosystem_stats = validate_package_update = None
+
+
+class NPMPackageIngester:
+    """
+    Fetch each package exactly once and upsert it into MongoDB.
+
+    The work list is the union of a fresh top-package list and the names already
+    in the collection. New packages get a full document; existing packages get
+    their stats refreshed and their metadata refetched when it changed.
+    """
+
+    log_name = "failed_packages"  # Prefix of the failed packages log file
+    metrics_name = "ingest"  # Prefix of the metrics files
+
+    def __init__(
+        self,
+        batch_size: int = 128,
+        client: AsyncMongoClient | None = None,
+        concurrency: int = 50,
+        progress_interval: float = 30.0,
+        run_id: str | None = None,
+        shard: tuple[int, int] | None = None,
+        stats_cache_dir: str | None = "data/cache",
+        metrics_dir: str | None = "data/metrics",
+        parse_workers: int = 0,
+        parse_offload_bytes: int = OFFLOAD_PACKUMENT_BYTES,
+    ):
+        self.batch_size = batch_size  # Packages whose trends are fetched together
+        self.concurrency = concurrency  # Packages in flight at once
+        self.progress_interval = progress_interval  # Seconds between snapshots
+        # Journal id of the weekly run; every stored package is stamped with it
+        # so a restarted run can skip the packages it already completed
+        self.run_id = run_id
+        # (index, count): only process the stable hash partition `index` of
+        # `count`. The changes feed state is then left for the shard merge step.
+        self.shard = shard
+        self.changes_seq = None
+        self.pending_changed_names: set = set()
+        self.registry_url = "https://registry.npmjs.org"
+        self.downloads_url = "https://api.npmjs.org/downloads"
+        self.ecosystem_url = (
+            "https://packages.ecosyste.ms/api/v1/registries/npmjs.org/packages"
+        )
+        # Transient upstream errors are retried a few times in place; packages
+        # still failing are deferred to one more pass at the end of the run
+        self.retry_policy = RetryPolicy()
+        self.retry_pass_delay = 60.0  # Seconds of calm before the deferred pass
+        self.defer_retries = True
+        self.deferred_work: List[tuple[str, Dict | None]] = []
+        self.recovered_names = set()  # Deferred packages that succeeded on retry
+        self.trends_fetcher = DownloadTrendsFetcher(
+            self.downloads_url, retry_policy=self.retry_policy
+        )
+        # Slow-changing ecosyste.ms stats are cached across runs (None disables).
+        # Shards get their own file since they never share packages.
+        self.stats_cache = None
+        if stats_cache_dir:
+            suffix = f"_{shard[0]}of{shard[1]}" if shard else ""
+            self.stats_cache = EcosystemStatsCache(
+                Path(stats_cache_dir) / f"ecosystem_stats{suffix}.sqlite"
+            )
+        self.changes_feed = RegistryChangesFeed(retry_policy=self.retry_policy)
+        # Processes that decode packuments above `parse_offload_bytes` off the
+        # event loop (0 decodes everything in the event loop's thread)
+        self.parse_workers = parse_workers
+        self.parse_offload_bytes = parse_offload_bytes
+        self.parse_executor: ProcessPoolExecutor | None = None
+        # Request, decode and write metrics of the run, saved to `metrics_dir`
+        # as JSON and as a Prometheus textfile (None disables saving)
+        self.metrics = MetricsRegistry()
+        self.metrics_dir = metrics_dir
+
+        # MongoDB setup
+        self.client = client or get_client()
+        self.db = self.client[DATABASE_NAME]
+        self.collection = self.db["packages"]
+        self.history_store = DownloadHistoryStore(
+            self.db["download_history"], self.metrics
+        )
+        self.reverse_dependencies = ReverseDependencyIndex(
+            self.db["dependents"], self.metrics
+        )
+
+        # Setup logging directory
+        self.log_dir = Path("data/logs")
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.failed_packages = []
+
+        # Buffered writes, flushed as unordered bulk_write batches
+        self.write_sink = BulkWriteSink(
+            self.collection, self.log_failed_write, metrics=self.metrics
+        )
+
+        # Incremental mode: only these existing names get their metadata
+        # refetched. None means every package is refetched.
+        self.metadata_names: set | None = None
+        # Scheduled mode: decides which stored packages are due for a refresh
+        self.scheduler: RefreshScheduler | None = None
+
+        # Per-run counts
+        self.new_names = set()
+        self.updated_count = 0
+        self.not_modified_count = 0  # Registry responses answered with 304
+        self.metadata_skipped_count = 0
+
+        # Progress tracking
+        self.total_processed = 0
+        self.total_to_process = 0
+        self.start_time = None
+
+    async def fetch_ecosystem_stats(
+        self, session: RateLimitedSession, package_name: str, use_cache: bool = True
+    ) -> Dict:
+        """
+        Fetch total downloads and dependents from ecosyste.ms, unless they are
+        still fresh in the stats cache (`use_cache=False` always fetches and
+        refreshes the cached entry). Raises UpstreamError on a failed request.
+        """
+        if self.stats_cache and use_cache:
+            cached_stats = self.stats_cache.get(package_name)
+            if cached_stats:
+                return cached_stats
+        async with session.get(f"{self.ecosystem_url}/{package_name}") as response:
+            if response.status != 200:
+                raise UpstreamError.from_response(
+                    "Failed to fetch ecosystem stats", response
+                )
+            if decode_ecosystem_stats is not None:
+                stats = await session.read_json(response, decode_ecosystem_stats)
+            else:
+                data = await session.read_json(response)
+                stats = {
+                    "total_downloads": data.get("downloads", 0),
+                    "dependent_packages_count": data.get("dependent_packages_count", 0),
+                    "dependent_repos_count": data.get("dependent_repos_count", 0),
+                }
+        if self.stats_cache:
+            self.stats_cache.put(package_name, stats)
+        return stats
+
+    async def fetch_packument(
+        self,
+        session: RateLimitedSession,
+        package_name: str,
+        registry_cache: Dict | None = None,
+    ):
+        """
+        Fetch a packument summary from the npm registry, conditional on the
+        stored validators. Returns (summary, registry_cache), or (None, None) on a 304.
+        """
+        async with session.get(
+            f"{self.registry_url}/{package_name}",
+            headers=get_conditional_headers(registry_cache),
+        ) as response:
+            if response.status == 304:
+                self.not_modified_count += 1
+                return None, None
+            if response.status != 200:
+                raise UpstreamError.from_response(
+                    "Failed to fetch package info", response
+                )
+            # Stream only the fields we store out of the packument
+            with session.metrics.timer("packument_parse_seconds"):
+                packument = await parse_packument_response(
+                    response,
+                    self.parse_executor,
+                    self.parse_offload_bytes,
+                    self.restart_parse_pool,
+                )
+            return packument, get_registry_validators(response.headers)
+
+    def save_failed_packages_log(self):
+        """Save the log of failed packages to a file."""
+        if self.failed_packages:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            log_file = self.log_dir / f"{self.log_name}_{timestamp}.log"
+            with open(log_file, "w") as f:
+                json.dump(self.failed_packages, f, indent=2)
+            print(f"Failed packages log saved to: {log_file}")
+
+    def log_failed_package(self, package_name: str, error: str):
+        """Log a package that failed to process."""
+        self.failed_packages.append(
+            {
+                "package": package_name,
+                "error": error,
+                "timestamp": datetime.datetime.now().isoformat(),
+            }
+        )
+
+    def log_failed_write(self, package_name: str, error: str):
+        """Log a package whose buffered upsert was rejected by MongoDB."""
+        print(f"✗ Error storing {package_name}: {error}")
+        if package_name in self.new_names:
+            self.new_names.discard(package_name)
+        else:
+            self.updated_count -= 1
+        self.recovered_names.discard(package_name)
+        if self.scheduler:
+            self.scheduler.record_executed(package_name, -1)
+        self.log_failed_package(package_name, error)
+
+    def print_progress(self, queue: asyncio.Queue):
+        """Print a progress snapshot of the running ingestion."""
+        elapsed = time.time() - self.start_time
+        failed = len(self.failed_packages)
+        rate = self.total_processed / elapsed if elapsed > 0 else 0
+        remaining = self.total_to_process - self.total_processed
+        print(f"\n--- Progress after {elapsed:.0f} seconds ---")
+        print(f"Processed: {self.total_processed}/{self.total_to_process}")
+        print(f"Successful: {self.total_processed - failed}")
+        print(f"Failed: {failed}")
+        print(f"Throughput: {rate:.1f} packages/second")
+        print(f"Queued for workers: {queue.qsize()}")
+        if rate > 0 and remaining > 0:
+            print(f"Estimated time remaining: {remaining / rate:.0f} seconds")
+
+    def build_metadata_fields(
+        self, package_name: str, packument: Dict, registry_cache: Dict
+    ) -> Dict:
+        """Build the document fields that come from the registry packument."""
+        return {
+            "description": packument["description"],
+            "link": f"https://www.npmjs.com/package/{package_name}",
+            "dependencies": packument["dependencies"],
+            "peerDependencies": packument["peerDependencies"],
+            "latest_version": packument["latest_version"],
+            "keywords": packument["keywords"],
+            "keywords_normalized": normalize_keywords(packument["keywords"]),
+            # NPM package timestamps
+            "npm_timestamps": {
+                "created_at": packument["created_at"],
+                "modified_at": packument["modified_at"],
+            },
+            # Registry validators for conditional requests on later runs
+            "registry_cache": registry_cache,
+        }
+
+    async def ingest_package(
+        self,
+        session: RateLimitedSession,
+        package_name: str,
+        package_doc: Dict | None,
+        weekly_stats: Dict | None = None,
+    ):
+        """
+        Fetch one package and queue its upsert.
+        `package_doc` is the stored document for existing packages and None for
+        new ones. Existing packages only get their metadata refreshed when the
+        registry reports a change. Requests are retried under `retry_policy`; a
+        package that still fails transiently is deferred to the retry pass.
+        """
+        is_new = package_doc is None
+        deferred = False
+        try:
+            packument = registry_cache = None
+            if (
+                not is_new
+                and self.metadata_names is not None
+                and package_name not in self.metadata_names
+            ):
+                self.metadata_skipped_count += 1
+            else:
+                packument, registry_cache = await self.with_retries(
+                    session,
+                    self.registry_url,
+                    lambda: self.fetch_packument(
+                        session,
+                        package_name,
+                        None if is_new else package_doc.get("registry_cache"),
+                    ),
+                )
+
+            # Fetch ecosystem statistics (downloads, dependents). Hot packages
+            # lead the leaderboard, so their totals are never served from cache
+            stored_tier = ((package_doc or {}).get("refresh") or {}).get("tier")
+            ecosystem_stats = await self.with_retries(
+                session,
+                self.ecosystem_url,
+                lambda: self.fetch_ecosystem_stats(
+                    session, package_name, use_cache=stored_tier != "hot"
+                ),
+            )
+
+            # Fetch weekly download trends unless they were prefetched in bulk
+            # (range requests are retried inside the trends fetcher)
+            if weekly_stats is None:
+                weekly_stats = await self.trends_fetcher.fetch_single(
+                    session, package_name
+                )
+            if weekly_stats.get("error"):
+                raise UpstreamError(
+                    weekly_stats["error"],
+                    retryable=weekly_stats.get("retryable", False),
+                )
+            if weekly_stats.get("history"):
+                await self.history_store.save(package_name, weekly_stats["history"])
+
+            now = datetime.datetime.now()
+            update_fields = {
+                "downloads": {
+                    "total": ecosystem_stats["total_downloads"],
+                    "weekly_trends": weekly_stats["weekly_trends"],
+                },
+                "dependent_packages_count": ecosystem_stats["dependent_packages_count"],
+                "dependent_repos_count": ecosystem_stats["dependent_repos_count"],
+                # Precomputed so the growth leaderboard is an indexed sort
+                **weekly_stats["growth"],
+                "db_updated_at": now,
+            }
+            if self.run_id:
+                update_fields["ingest_run_id"] = self.run_id
+            if packument is not None:
+                update_fields.update(
+                    self.build_metadata_fields(package_name, packument, registry_cache)
+                )
+            if self.scheduler:
+                update_fields.update(
+                    self.scheduler.schedule(
+                        package_name,
+                        ecosystem_stats["total_downloads"],
+                        weekly_stats["growth"]["lastWeekGrowth"],
+                        # A stored package whose packument was not a 304
+                        metadata_changed=not is_new and packument is not None,
+                    )
+                )
+
+            if validate_package_update is not None:
+                # Malformed upstream data fails the package instead of being stored
+                validate_package_update(update_fields)
+
+            # Replace the dependency edges first, so a failure here fails (or
+            # defers) the package before it is counted or its upsert queued
+            if packument is not None:
+                await self.reverse_dependencies.update_package(
+                    package_name,
+                    packument["dependencies"],
+                    packument["peerDependencies"],
+                )
+
+            # Count the package before queueing its upsert: queueing can flush
+            # the batch, and a rejected write takes these counts back
+            if self.scheduler:
+                self.scheduler.record_executed(package_name)
+            if not self.defer_retries:
+                self.recovered_names.add(package_name)
+            if is_new:
+                self.new_names.add(package_name)
+            else:
+                self.updated_count += 1
+
+            # Queue upsert for the next bulk write to MongoDB
+            await self.write_sink.add(
+                package_name,
+                UpdateOne(
+                    {"name": package_name},
+                    {
+                        "$set": update_fields,
+                        "$setOnInsert": {"db_created_at": now},
+                    },
+                    upsert=True,
+                ),
+            )
+
+        except Exception as e:
+            if self.defer_retries and is_retryable(e):
+                deferred = True
+                self.deferred_work.append((package_name, package_doc))
+            else:
+                error_msg = f"✗ Error processing {package_name}: {str(e)}"
+                print(error_msg)
+                self.log_failed_package(package_name, str(e))
+        finally:
+            if not deferred:
+                self.total_processed += 1
+
+    def make_parse_executor(self) -> Executor:
+        # Forked workers would inherit the running event loop and aiohttp's
+        # resolver threads, so start them from a clean process instead
+        start_methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in start_methods else "spawn"
+        )
+        return ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=context)
+
+    def restart_parse_pool(self, broken: Executor):
+        """Replace a parse pool that a crashed worker broke (once per pool)."""
+        if self.parse_executor is not broken:
+            return
+        print("Packument parse pool broke, starting a new one")
+        self.metrics.inc("parse_pool_restarts_total")
+        broken.shutdown(wait=False)
+        self.parse_executor = self.make_parse_executor()
+
+    @asynccontextmanager
+    async def parse_pool(self):
+        """Run the packument parse worker processes for the duration of a run."""
+        if not self.parse_workers:
+            yield
+            return
+        self.parse_executor = self.make_parse_executor()
+        try:
+            yield
+        finally:
+            executor, self.parse_executor = self.parse_executor, None
+            # Wait for the workers to exit without blocking the event loop
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def run_retry_pass(self, session: RateLimitedSession, worker):
+        """
+        Give the deferred packages one more attempt once upstream pressure has
+        dropped: after `retry_pass_delay` seconds (longer while a host's
+        Retry-After pause lasts), at a quarter of the concurrency. Failures in
+        this pass are final.
+        """
+        if not self.deferred_work:
+            return
+        work, self.deferred_work = self.deferred_work, []
+        delay = max(self.retry_pass_delay, session.get_pause_remaining())
+        print(f"\nRetrying {len(work)} deferred packages in {delay:.0f} seconds")
+        await asyncio.sleep(delay)
+        self.defer_retries = False
+        await run_worker_pool(
+            self.produce_work(session, work),
+            worker,
+            concurrency=max(1, self.concurrency // 4),
+            on_progress=self.print_progress,
+            progress_interval=self.progress_interval,
+            metrics=self.metrics,
+        )
+
+    def with_retries(self, session: RateLimitedSession, url: str, operation):
+        """Run `operation` under the retry policy, counting retries against `url`'s host."""
+        return self.retry_policy.run(
+            operation, on_retry=lambda error, delay: session.record_retry(url)
+        )
+
+    async def produce_work(
+        self, session: RateLimitedSession, work: List[tuple[str, Dict | None]]
+    ):
+        """
+        Yield (name, stored document or None, weekly trends) for every package.
+        Trends are fetched ahead in bulk for `batch_size` packages at a time,
+        only requesting the days missing from their stored download history.
+        """
+        for i in range(0, len(work), self.batch_size):
+            chunk = work[i : i + self.batch_size]
+            chunk_names = [name for name, _ in chunk]
+            chunk_trends = await self.trends_fetcher.fetch_trends(
+                session, chunk_names, await self.history_store.load(chunk_names)
+            )
+            for name, doc in chunk:
+                yield name, doc, chunk_trends.get(name)
+
+    async def select_changed_packages(
+        self, session: RateLimitedSession, sync: SyncMetadata, tracked_names: set
+    ):
+        """
+        Restrict metadata refetches to packages the registry changes feed lists.
+        Returns the feed sequence to store once the run finishes. Without a stored
+        sequence every package is refetched and the current sequence is returned.
+        If the feed stays unavailable every package is refetched too, and None
+        is returned so the stored feed state is kept for the next run.
+        """
+        since, pending_names = await sync.get_changes_feed_state()
+        try:
+            if since is None:
+                print("No changes feed sequence stored yet, refetching all metadata")
+                return await self.changes_feed.get_current_seq(session)
+
+            changed_names, last_seq = await self.changes_feed.fetch_changed_names(
+                session, since
+            )
+        except Exception as e:
+            print(f"Changes feed unavailable ({e}), refetching all metadata")
+            return None
+        self.metadata_names = (changed_names | set(pending_names)) & tracked_names
+        print(
+            f"Changes feed: {len(changed_names)} changed packages since {since}, "
+            f"{len(self.metadata_names)} of them tracked"
+        )
+        return last_seq
+
+    async def load_existing_packages(
+        self, top_names: List[str] | None, include_existing: bool
+    ) -> Dict[str, Dict]:
+        """Load the stored documents the run needs, keyed by package name."""
+        projection = {
+            "name": 1,
+            "registry_cache": 1,
+            "ingest_run_id": 1,
+            # Refresh scheduling
+            "downloads.total": 1,
+            "refresh": 1,
+            "db_updated_at": 1,
+        }
+        if include_existing:
+            query = {}
+        else:
+            # Only look up the candidate names, not the whole collection
+            query = {"name": {"$in": top_names or []}}
+        return {
+            doc["name"]: doc async for doc in self.collection.find(query, projection)
+        }
+
+    async def ingest_packages(
+        self,
+        top_names: List[str] | None = None,
+        include_existing: bool = True,
+        incremental: bool = False,
+        scheduled: bool = False,
+    ):
+        """
+        Ingest the union of `top_names` and, if `include_existing`, every package
+        already in the database. Each package is fetched exactly once.
+        In incremental mode metadata of existing packages is only refetched when
+        the registry changes feed lists them; their stats are always refreshed.
+        In scheduled mode only new packages, stored packages whose refresh tier
+        is due and packages the changes feed lists are refreshed.
+        """
+        existing_packages = await self.load_existing_packages(
+            top_names, include_existing
+        )
+        new_names = [
+            name
+            for name in dict.fromkeys(top_names or [])
+            if name not in existing_packages
+        ]
+        work = [(name, None) for name in new_names]
+        if include_existing:
+            work.extend(existing_packages.items())
+        if self.shard:
+            work = [(name, doc) for name, doc in work if in_shard(name, self.shard)]
+
+        completed_count = 0
+        if self.run_id:
+            # Resuming: skip packages this run already stored
+            pending_work = [
+                (name, doc)
+                for name, doc in work
+                if not doc or doc.get("ingest_run_id") != self.run_id
+            ]
+            completed_count = len(work) - len(pending_work)
+            work = pending_work
+
+        print("\nInitial Status:")
+        if self.shard:
+            print(f"Shard: {format_shard(self.shard)}")
+        print(f"Packages in top list: {len(top_names or [])}")
+        print(f"Packages already in DB: {len(existing_packages)}")
+        print(f"New packages: {len(new_names)}")
+        if completed_count:
+            print(f"Already completed by this run: {completed_count}")
+        print(f"Packages to process: {len(work)}")
+
+        if not work:
+            # Still read the changes feed and save the run's logs and metrics
+            print("No packages to process!")
+
+        async with aiohttp.ClientSession() as client_session, self.parse_pool():
+            # Every upstream host gets its own adaptive concurrency limit
+            session = RateLimitedSession(client_session, metrics=self.metrics)
+            if incremental:
+                sync = SyncMetadata(client=self.client)
+                self.changes_seq = await self.select_changed_packages(
+                    session, sync, set(existing_packages)
+                )
+            if scheduled:
+                self.scheduler = RefreshScheduler()
+                # Ranks cover every stored package, not just this shard
+                self.scheduler.set_ranks(existing_packages.values())
+                changed_names = self.metadata_names or set()
+                work = [
+                    (name, doc)
+                    for name, doc in work
+                    if self.scheduler.plan(name, doc, force=name in changed_names)
+                ]
+                print(f"Packages due for refresh: {len(work)}")
+
+            self.total_to_process = len(work)
+            self.start_time = time.time()
+
+            async def worker(item):
+                name, doc, weekly_stats = item
+                await self.ingest_package(session, name, doc, weekly_stats)
+
+            if work:
+                print(f"\nProcessing with {self.concurrency} concurrent workers")
+                await run_worker_pool(
+                    self.produce_work(session, work),
+                    worker,
+                    concurrency=self.concurrency,
+                    on_progress=self.print_progress,
+                    progress_interval=self.progress_interval,
+                    metrics=self.metrics,
+                )
+                await self.run_retry_pass(session, worker)
+
+        # Write whatever is still buffered
+        await self.write_sink.flush()
+        await self.history_store.flush()
+        await self.reverse_dependencies.flush()
+        if self.stats_cache:
+            self.stats_cache.close()
+
+        if incremental:
+            # Changed packages that failed are retried by the next run
+            failed_names = {failure["package"] for failure in self.failed_packages}
+            self.pending_changed_names = (self.metadata_names or set()) & failed_names
+            if self.shard:
+                print("Changes feed state is left for the shard merge step")
+            elif self.changes_seq is None:
+                print("Changes feed state kept; the next run reads the feed again")
+            else:
+                await sync.update_changes_feed_state(
+                    self.changes_seq, list(self.pending_changed_names)
+                )
+
+        # Save failed packages log
+        self.save_failed_packages_log()
+        self.print_summary()
+        if self.scheduler:
+            self.scheduler.print_summary()
+        if self.stats_cache:
+            self.stats_cache.print_summary()
+        session.print_summary()
+        self.metrics.print_summary()
+        self.save_metrics()
+
+    def save_metrics(self):
+        """Record the run totals and write the metrics files."""
+        failed = len(self.failed_packages)
+        for result, count in (
+            ("new", len(self.new_names)),
+            ("updated", self.updated_count),
+            ("failed", failed),
+            ("not_modified", self.not_modified_count),
+        ):
+            self.metrics.inc("run_packages_total", count, result=result)
+        self.metrics.set_gauge("run_duration_seconds", time.time() - self.start_time)
+        if self.metrics_dir:
+            suffix = f"_{self.shard[0]}of{self.shard[1]}" if self.shard else ""
+            self.metrics.save(self.metrics_dir, f"{self.metrics_name}{suffix}")
+
+    def print_summary(self):
+        """Print the final per-run counts."""
+        print("\n=== Final Processing Summary ===")
+        print(f"Total packages processed: {self.total_processed}")
+        print(f"New packages: {len(self.new_names)}")
+        print(f"Updated packages: {self.updated_count}")
+        print(f"Failed packages: {len(self.failed_packages)}")
+        print(f"Not modified since last run (304): {self.not_modified_count}")
+        print(f"Metadata skipped (unchanged in feed): {self.metadata_skipped_count}")
+        print(f"Recovered by the end-of-run retry pass: {len(self.recovered_names)}")
+        print(
+            f"Download days requested: {self.trends_fetcher.days_requested} "
+            f"in {self.trends_fetcher.total_requests} requests"
+        )
+        success_rate = (
+            (
+                (self.total_processed - len(self.failed_packages))
+                / self.total_processed
+                * 100
+            )
+            if self.total_processed > 0
+            else 0
+        )
+        print(f"Overall success rate: {success_rate:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ingest the top package list and every stored package in one pass."
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        default="data/package_names.ndjson",
+        help="File location to find package names (NDJSON pages or json list)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=128,
+        help="Number of packages whose download trends are fetched together",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=50,
+        help="Number of packages processed concurrently",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only refetch metadata for packages listed in the registry changes feed",
+    )
+    parser.add_argument(
+        "--scheduled",
+        action="store_true",
+        help="Only refresh stored packages whose refresh tier is due",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="Only process the stable hash partition i of N package names (i/N)",
+    )
+    args = parser.parse_args()
+
+    top_names = load_package_names(args.input)
+
+    async def run():
+        ingester = NPMPackageIngester(
+            batch_size=args.batch_size, concurrency=args.concurrency, shard=args.shard
+        )
+        try:
+            await ingester.ingest_packages(
+                top_names, incremental=args.incremental, scheduled=args.scheduled
+            )
+        finally:
+            await close_client()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    main()
+    print(f"\nTotal execution time: {time.time() - start_time:.2f} seconds")
@@ -0,0 +1,242 @@
+import asyncio
+import json
+from concurrent.futures import BrokenExecutor, Executor
+from typing import BinaryIO, Callable, Dict, List
+
+import aiohttp
+
+try:
+    import ijson
+except ImportError:  # Fall back to full json parsing
+    ijson = None
+
+try:
+    from .upstreamSchemas import decode_packument
+except ImportError:  # msgspec is missing; small bodies are streamed too
+    decode_packument = None
+
+# Bodies up to this size are read whole and decoded with msgspec, which is much
+# faster than streaming; larger ones are streamed to keep memory bounded
+MAX_BUFFERED_PACKUMENT_BYTES = 2 * 1024 * 1024
+
+# With a parse executor, bodies above this size are summarized in the executor
+OFFLOAD_PACKUMENT_BYTES = 1024 * 1024
+
+_ARRAY_ITEM = object()  # Path marker for array elements
+_DEPENDENCY_FIELDS = ("dependencies", "peerDependencies")
+
+
+class PackumentExtractor:
+    """
+    Build a packument summary from a stream of ijson basic_parse events.
+
+    Only the fields the ingester stores are kept: dist-tags.latest, description,
+    keywords, time.created/modified and the dependency names of the latest
+    version. Everything else is skipped as it streams past, so memory stays
+    bounded no matter how many versions the packument has.
+    """
+
+    def __init__(self):
+        self.path: List = []
+        self.latest_version = None
+        self.description = ""
+        self.keywords = []
+        self.created_at = None
+        self.modified_at = None
+        # Dependency names per version, only kept for the latest version once
+        # dist-tags has been seen (it usually comes before versions)
+        self.version_dependencies: Dict[str, Dict[str, List[str]]] = {}
+
+    def keep_version(self, version: str) -> bool:
+        return self.latest_version is None or version == self.latest_version
+
+    def feed(self, event: str, value):
+        path = self.path
+        if event == "map_key":
+            path[-1] = value
+            depth = len(path)
+            if depth == 2 and path[0] == "versions" and self.keep_version(value):
+                self.version_dependencies.setdefault(
+                    value, {field: [] for field in _DEPENDENCY_FIELDS}
+                )
+            elif (
+                depth == 4
+                and path[0] == "versions"
+                and path[2] in _DEPENDENCY_FIELDS
+                and path[1] in self.version_dependencies
+            ):
+                self.version_dependencies[path[1]][path[2]].append(value)
+        elif event == "start_map":
+            if path == ["keywords"]:
+                # Not a list or string, so not keywords (as in decode_packument)
+                self.keywords = None
+            path.append(None)
+        elif event == "start_array":
+            path.append(_ARRAY_ITEM)
+        elif event in ("end_map", "end_array"):
+            path.pop()
+        else:
+            self.feed_value(value)
+
+    def feed_value(self, value):
+        path = self.path
+        depth = len(path)
+        if depth == 1:
+            if path[0] == "description" and isinstance(value, str):
+                self.description = value
+            elif path[0] == "keywords":
+                # Some old packuments store keywords as a plain string; null
+                # and numbers are dropped like in decode_packument
+                self.keywords = value if isinstance(value, str) else None
+        elif depth == 2:
+            if path[0] == "dist-tags" and path[1] == "latest":
+                self.latest_version = value
+                # Drop versions buffered before dist-tags was known
+                self.version_dependencies = {
+                    version: deps
+                    for version, deps in self.version_dependencies.items()
+                    if version == value
+                }
+            elif (
+                path[0] == "keywords"
+                and path[1] is _ARRAY_ITEM
+                and isinstance(value, str)
+            ):
+                self.keywords.append(value)
+            elif path[0] == "time" and path[1] == "created":
+                self.created_at = value
+            elif path[0] == "time" and path[1] == "modified":
+                self.modified_at = value
+
+    def result(self) -> Dict:
+        """Return the packument summary, raising if there is no latest version."""
+        if (
+            not self.latest_version
+            or self.latest_version not in self.version_dependencies
+        ):
+            raise Exception("No version information found")
+        latest_dependencies = self.version_dependencies[self.latest_version]
+        return {
+            "latest_version": self.latest_version,
+            "description": self.description,
+            "keywords": self.keywords,
+            "dependencies": latest_dependencies["dependencies"],
+            "peerDependencies": latest_dependencies["peerDependencies"],
+            "created_at": self.created_at,
+            "modified_at": self.modified_at,
+        }
+
+
+def clean_keywords(keywords) -> List[str] | str | None:
+    """Keep the string keywords of a list, a plain string, or None for anything else."""
+    if isinstance(keywords, list):
+        return [keyword for keyword in keywords if isinstance(keyword, str)]
+    return keywords if isinstance(keywords, str) else None
+
+
+def summarize_packument(data: Dict) -> Dict:
+    """Build the same summary as PackumentExtractor from an already parsed packument."""
+    latest_version = data.get("dist-tags", {}).get("latest")
+    if not latest_version or latest_version not in data.get("versions", {}):
+        raise Exception("No version information found")
+    latest_data = data["versions"][latest_version]
+    time_data = data.get("time", {})
+    return {
+        "latest_version": latest_version,
+        "description": data.get("description", ""),
+        "keywords": clean_keywords(data.get("keywords", [])),
+        "dependencies": list(latest_data.get("dependencies", {}).keys()),
+        "peerDependencies": list(latest_data.get("peerDependencies", {}).keys()),
+        "created_at": time_data.get("created"),
+        "modified_at": time_data.get("modified"),
+    }
+
+
+def parse_packument_file(file: BinaryIO) -> Dict:
+    """Summarize a packument read from a binary file object."""
+    if ijson is None:
+        return summarize_packument(json.load(file))
+    extractor = PackumentExtractor()
+    for event, value in ijson.basic_parse(file):
+        extractor.feed(event, value)
+    return extractor.result()
+
+
+class PrefixedStream:
+    """Async file-like object replaying `prefix` before the rest of `content`."""
+
+    def __init__(self, prefix: bytes, content: aiohttp.StreamReader):
+        self.prefix = prefix
+        self.content = content
+
+    async def read(self, size: int = -1) -> bytes:
+        if not self.prefix:
+            return await self.content.read(size)
+        if size < 0:
+            size = len(self.prefix)
+        data, self.prefix = self.prefix[:size], self.prefix[size:]
+        return data
+
+
+async def read_head(content: aiohttp.StreamReader, limit: int) -> tuple[bytes, bool]:
+    """Read up to `limit` bytes; returns (bytes read, whether the body ended)."""
+    chunks = []
+    size = 0
+    while size <= limit:
+        chunk = await content.read(64 * 1024)
+        if not chunk:
+            return b"".join(chunks), True
+        chunks.append(chunk)
+        size += len(chunk)
+    return b"".join(chunks), False
+
+
+def parse_packument_bytes(body: bytes) -> Dict:
+    """Summarize a whole packument body (also what parse worker processes run)."""
+    if decode_packument is not None:
+        return decode_packument(body)
+    return summarize_packument(json.loads(body))
+
+
+async def parse_packument_response(
+    response: aiohttp.ClientResponse,
+    executor: Executor | None = None,
+    offload_bytes: int = OFFLOAD_PACKUMENT_BYTES,
+    on_broken_executor: Callable[[Executor], None] | None = None,
+) -> Dict:
+    """
+    Turn a registry response body into a packument summary. Bodies that fit in
+    MAX_BUFFERED_PACKUMENT_BYTES are decoded with the msgspec schema; larger
+    ones are streamed through PackumentExtractor.
+    With an `executor` (a process pool), bodies above `offload_bytes` are read
+    whole and summarized there instead, so decoding them never blocks the
+    event loop and only the compact summary comes back. If a crashed worker
+    broke the executor, the body is summarized here and `on_broken_executor`
+    is called with the broken executor.
+    """
+    if executor is not None:
+        head, complete = await read_head(response.content, offload_bytes)
+        if complete:
+            return parse_packument_bytes(head)
+        body = head + await response.content.read()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, parse_packument_bytes, body
+            )
+        except BrokenExecutor:
+            if on_broken_executor:
+                on_broken_executor(executor)
+            return parse_packument_bytes(body)
+    if decode_packument is not None:
+        head, complete = await read_head(response.content, MAX_BUFFERED_PACKUMENT_BYTES)
+        if complete or ijson is None:
+            return decode_packument(head + await response.read())
+        stream = PrefixedStream(head, response.content)
+    elif ijson is None:
+        return summarize_packument(await response.json())
+    else:
+        stream = response.content
+    extractor = PackumentExtractor()
+    async for event, value in ijson.basic_parse_async(stream):
+        extractor.feed(event, value)
+    return extractor.result()
@@ -0,0 +1,139 @@
+import datetime
+from collections import Counter
+from typing import Dict, Iterable
+
+# Refresh interval per tier. Cold packages are refreshed at MAX_STALENESS.
+TIER_INTERVALS = {
+    "hot": datetime.timedelta(days=7),
+    "warm": datetime.timedelta(days=14),
+    "cold": datetime.timedelta(days=28),
+}
+MAX_STALENESS = datetime.timedelta(days=28)
+
+# Runs start at a fixed time but finish hours later, so a package written
+# 7 days before the *end* of the last run must still count as due
+DUE_GRACE = datetime.timedelta(days=1)
+
+
+class RefreshScheduler:
+    """
+    Decide which stored packages a run refreshes.
+
+    Every refreshed package gets a tier and a `refresh.next_due_at`:
+    - hot: top `hot_rank` by downloads, metadata changed in the registry, or
+      last-week growth beyond +/-`volatile_growth` percent
+    - warm: top `warm_rank` or at least `warm_downloads` total downloads
+    - cold: everything else
+    A package is due once its next_due_at has passed, and always once its last
+    refresh is MAX_STALENESS old. Packages without a schedule are always due.
+    """
+
+    def __init__(
+        self,
+        now: datetime.datetime | None = None,
+        hot_rank: int = 1000,
+        warm_rank: int = 10000,
+        warm_downloads: int = 100_000,
+        volatile_growth: float = 25.0,
+    ):
+        self.now = now or datetime.datetime.now()
+        self.hot_rank = hot_rank
+        self.warm_rank = warm_rank
+        self.warm_downloads = warm_downloads
+        self.volatile_growth = volatile_growth
+        self.ranks: Dict[str, int] = {}
+
+        self.planned_tiers: Dict[str, str] = {}  # Due package -> stored tier
+        self.planned = Counter()
+        self.skipped = Counter()
+        self.executed = Counter()
+
+    def set_ranks(self, package_docs: Iterable[Dict]):
+        """Rank all stored packages by total downloads (0 is the most downloaded)."""
+        totals = sorted(
+            (
+                ((doc.get("downloads") or {}).get("total") or 0, doc["name"])
+                for doc in package_docs
+            ),
+            reverse=True,
+        )
+        self.ranks = {name: rank for rank, (_, name) in enumerate(totals)}
+
+    def is_due(self, package_doc: Dict) -> bool:
+        refresh = package_doc.get("refresh")
+        if not refresh:
+            return True
+        last_refresh = package_doc.get("db_updated_at")
+        if last_refresh and self.now + DUE_GRACE - last_refresh >= MAX_STALENESS:
+            return True
+        return refresh["next_due_at"] <= self.now + DUE_GRACE
+
+    def plan(
+        self, package_name: str, package_doc: Dict | None, force: bool = False
+    ) -> bool:
+        """
+        Whether the run should refresh this package. New packages (no stored
+        document) are always refreshed; `force` marks a stored one due
+        regardless of its schedule (e.g. it changed in the registry).
+        """
+        if package_doc is None:
+            tier = "new"
+        else:
+            tier = (package_doc.get("refresh") or {}).get("tier", "unscheduled")
+        if package_doc is None or force or self.is_due(package_doc):
+            self.planned[tier] += 1
+            self.planned_tiers[package_name] = tier
+            return True
+        self.skipped[tier] += 1
+        return False
+
+    def assign_tier(
+        self,
+        package_name: str,
+        total_downloads: int | None,
+        last_week_growth: float,
+        metadata_changed: bool,
+    ) -> str:
+        rank = self.ranks.get(package_name)
+        if (
+            metadata_changed
+            or abs(last_week_growth) >= self.volatile_growth
+            or (rank is not None and rank < self.hot_rank)
+        ):
+            return "hot"
+        if (rank is not None and rank < self.warm_rank) or (
+            (total_downloads or 0) >= self.warm_downloads
+        ):
+            return "warm"
+        return "cold"
+
+    def schedule(
+        self,
+        package_name: str,
+        total_downloads: int | None,
+        last_week_growth: float,
+        metadata_changed: bool,
+    ) -> Dict:
+        """Document fields recording the tier and next due time of a refresh."""
+        tier = self.assign_tier(
+            package_name, total_downloads, last_week_growth, metadata_changed
+        )
+        interval = min(TIER_INTERVALS[tier], MAX_STALENESS)
+        return {"refresh": {"tier": tier, "next_due_at": self.now + interval}}
+
+    def record_executed(self, package_name: str, count: int = 1):
+        """
+        Count a refresh against the tier it was planned under
+        (-1 takes it back when the write is rejected).
+        """
+        self.executed[self.planned_tiers[package_name]] += count
+
+    def print_summary(self):
+        print("\n=== Refresh Schedule ===")
+        tiers = sorted(set(self.planned) | set(self.skipped) | set(self.executed))
+        for tier in tiers:
+            print(
+                f"{tier}: planned {self.planned[tier]}, "
+                f"executed {self.executed[tier]}, "
+                f"not due {self.skipped[tier]}"
+            )
@@ -0,0 +1,104 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, TypeVar
+
+import aiohttp
+
+from .httpClient import parse_retry_after
+
+T = TypeVar("T")
+
+# Statuses worth another attempt; anything else (404, 400, ...) will not change
+RETRYABLE_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+
+class UpstreamError(Exception):
+    """
+    A failed upstream request. `status` is None when no response arrived;
+    `retryable` defaults to whether another attempt could succeed.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status: int | None = None,
+        retry_after: float | None = None,
+        retryable: bool | None = None,
+    ):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after  # Seconds the server asked us to wait
+        if retryable is None:
+            retryable = status is None or status in RETRYABLE_STATUSES
+        self.retryable = retryable
+
+    @classmethod
+    def from_response(
+        cls, message: str, response: aiohttp.ClientResponse
+    ) -> "UpstreamError":
+        return cls(
+            f"{message}: {response.status}",
+            status=response.status,
+            retry_after=parse_retry_after(response.headers.get("Retry-After")),
+        )
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient upstream failures: retryable statuses, timeouts and dropped connections."""
+    if isinstance(error, UpstreamError):
+        return error.retryable
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class RetryPolicy:
+    """
+    Retry transient failures with jittered exponential backoff.
+
+    The delay before attempt n+1 is drawn uniformly from
+    [0, min(max_delay, base_delay * 2**n)] ("full jitter"), so clients that
+    failed together do not retry together. A Retry-After from the server is
+    honoured as a lower bound, up to `max_retry_after`.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        max_retry_after: float = 120.0,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def get_delay(self, attempt: int, error: BaseException) -> float:
+        """Seconds to wait after failed attempt number `attempt` (0-based)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+    async def run(
+        self,
+        operation: Callable[[], Awaitable[T]],
+        on_retry: Callable[[BaseException, float], None] | None = None,
+    ) -> T:
+        """
+        Await `operation()` until it succeeds, fails with a non-retryable error
+        or runs out of attempts; the last error is raised. `on_retry` is called
+        with the error and the delay before each new attempt.
+        """
+        attempt = 0
+        while True:
+            try:
+                return await operation()
+            except Exception as e:
+                attempt += 1
+                if attempt >= self.max_attempts or not is_retryable(e):
+                    raise
+                delay = self.get_delay(attempt - 1, e)
+                if on_retry:
+                    on_retry(e, delay)
+                await asyncio.sleep(delay)
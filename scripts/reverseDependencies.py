@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+from typing import List
+
+from pymongo import DeleteMany, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+
+from .bulkWriter import BulkWriteSink
+from .database import DATABASE_NAME, close_client, get_client
+from .metrics import MetricsRegistry
+
+
+class ReverseDependencyIndex:
+    """
+    Maintain the "dependents" collection: one document per (dependency,
+    dependent) edge with `regular`/`peer` flags, so the packages depending on
+    a given name are a single indexed read.
+
+    Edges are replaced per dependent whenever its metadata is refetched, so the
+    collection follows the packages collection incrementally.
+    """
+
+    def __init__(
+        self, collection: AsyncCollection, metrics: MetricsRegistry | None = None
+    ):
+        self.collection = collection
+        self.write_sink = BulkWriteSink(
+            collection, self.log_failed_write, metrics=metrics
+        )
+
+    def log_failed_write(self, package_name: str, error: str):
+        # Rebuild with `python -m scripts.reverseDependencies --rebuild`
+        print(f"✗ Error saving reverse dependencies of {package_name}: {error}")
+
+    async def update_package(
+        self,
+        package_name: str,
+        dependencies: List[str],
+        peer_dependencies: List[str],
+    ):
+        """Replace the edges of one dependent with its current dependencies."""
+        dependency_names = sorted(set(dependencies) | set(peer_dependencies))
+        await self.write_sink.add(
+            package_name,
+            DeleteMany(
+                {"dependent": package_name, "dependency": {"$nin": dependency_names}}
+            ),
+        )
+        for dependency in dependency_names:
+            await self.write_sink.add(
+                package_name,
+                UpdateOne(
+                    {"dependency": dependency, "dependent": package_name},
+                    {
+                        "$set": {
+                            "regular": dependency in dependencies,
+                            "peer": dependency in peer_dependencies,
+                        }
+                    },
+                    upsert=True,
+                ),
+            )
+
+    async def flush(self):
+        await self.write_sink.flush()
+
+    async def rebuild(self, packages: AsyncCollection):
+        """
+        Recreate every edge from the dependencies stored in `packages`, and
+        delete the edges of dependents that are no longer stored there.
+        """
+        projection = {"name": 1, "dependencies": 1, "peerDependencies": 1}
+        package_names = set()
+        async for doc in packages.find({}, projection):
+            await self.update_package(
+                doc["name"],
+                doc.get("dependencies") or [],
+                doc.get("peerDependencies") or [],
+            )
+            package_names.add(doc["name"])
+
+        removed_names = set()
+        async for edge in self.collection.find({}, {"dependent": 1}):
+            if edge["dependent"] not in package_names:
+                removed_names.add(edge["dependent"])
+        for package_name in sorted(removed_names):
+            await self.write_sink.add(
+                package_name, DeleteMany({"dependent": package_name})
+            )
+        await self.flush()
+        print(
+            f"Reverse dependencies rebuilt for {len(package_names)} packages, "
+            f"edges of {len(removed_names)} removed packages deleted "
+            f"({self.write_sink.total_failed} failed writes)"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Maintain the reverse-dependency collection"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild every edge from the stored packages (e.g. after first deploy)",
+    )
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    client = get_client()
+    try:
+        db = client[DATABASE_NAME]
+        await ReverseDependencyIndex(db["dependents"]).rebuild(db["packages"])
+    finally:
+        await close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import sys
+
+from .database import close_client
+from .mergeShards import ShardMerger
+
+
+async def run_shard(index: int, shard_count: int, parse_workers: int = 0) -> int:
+    """Run one shard of the weekly update in its own process."""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-u",
+        "-m",
+        "scripts.weekly_update",
+        "--shard",
+        f"{index}/{shard_count}",
+        "--parse-workers",
+        str(parse_workers),
+    )
+    return_code = await process.wait()
+    print(f"Shard {index}/{shard_count} exited with code {return_code}")
+    return return_code
+
+
+async def run_shards(shard_count: int, parse_workers: int = 0) -> bool:
+    """Run every shard in parallel, then merge their results."""
+    return_codes = await asyncio.gather(
+        *(run_shard(index, shard_count, parse_workers) for index in range(shard_count))
+    )
+    if any(return_codes):
+        # Rerunning resumes the failed shards; finished ones exit immediately
+        print("Some shards failed, not merging")
+        return False
+    try:
+        return await ShardMerger(shard_count).merge()
+    finally:
+        await close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the weekly update as N parallel shard processes"
+    )
+    parser.add_argument(
+        "--shards", type=int, default=4, help="Number of shard processes to run"
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="Packument parse processes per shard (see scripts.weekly_update)",
+    )
+    args = parser.parse_args()
+    if not asyncio.run(run_shards(args.shards, args.parse_workers)):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+import zlib
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse an `i/N` shard spec (0 <= i < N) for argparse."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard must look like i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Shard index must be in [0, {count})")
+    return index, count
+
+
+def shard_of(package_name: str, shard_count: int) -> int:
+    """Stable hash partition of a package name (same result in every process)."""
+    return zlib.crc32(package_name.encode("utf-8")) % shard_count
+
+
+def in_shard(package_name: str, shard: tuple[int, int] | None) -> bool:
+    """Whether the package belongs to the given shard (always true without one)."""
+    if shard is None:
+        return True
+    index, count = shard
+    return shard_of(package_name, count) == index
+
+
+def format_shard(shard: tuple[int, int]) -> str:
+    return f"{shard[0]}/{shard[1]}"
@@ -0,0 +1,117 @@
+import json
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Dict
+
+DAY = 24 * 60 * 60
+
+# How long a cached entry stays fresh. One ecosyste.ms request returns all of
+# a package's stats, so they are cached and expire together. With the 0-25%
+# jitter each package is refetched every second or third weekly run.
+DEFAULT_TTL = 14 * DAY
+
+
+class EcosystemStatsCache:
+    """
+    On-disk cache of per-package ecosyste.ms stats, kept in SQLite.
+
+    Each package's TTL is stretched by a stable 0-25% jitter, so packages
+    cached in the same run expire over several later runs instead of all at
+    once. When the cache holds more than `max_entries` packages the least
+    recently used ones are evicted on close.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = 200_000,
+        commit_interval: int = 500,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.commit_interval = commit_interval  # Writes between commits
+
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS ecosystem_stats ("
+            "name TEXT PRIMARY KEY, stats TEXT NOT NULL, "
+            "fetched_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS ecosystem_stats_last_used "
+            "ON ecosystem_stats (last_used)"
+        )
+        self.uncommitted = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get_ttl(self, package_name: str) -> float:
+        jitter = zlib.crc32(package_name.encode("utf-8")) % 1000 / 4000
+        return self.ttl * (1 + jitter)
+
+    def get(self, package_name: str) -> Dict | None:
+        """Return the cached stats if they are still fresh, else None."""
+        row = self.connection.execute(
+            "SELECT stats, fetched_at FROM ecosystem_stats WHERE name = ?",
+            (package_name,),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        stats, fetched_at = json.loads(row[0]), row[1]
+        now = time.time()
+        if now - fetched_at > self.get_ttl(package_name):
+            self.expired += 1
+            return None
+        self.hits += 1
+        self.write(
+            "UPDATE ecosystem_stats SET last_used = ? WHERE name = ?",
+            (now, package_name),
+        )
+        return stats
+
+    def put(self, package_name: str, stats: Dict):
+        now = time.time()
+        self.write(
+            "INSERT OR REPLACE INTO ecosystem_stats VALUES (?, ?, ?, ?)",
+            (package_name, json.dumps(stats), now, now),
+        )
+
+    def write(self, sql: str, params: tuple):
+        self.connection.execute(sql, params)
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_interval:
+            self.connection.commit()
+            self.uncommitted = 0
+
+    def evict(self):
+        """Drop the least recently used entries beyond `max_entries`."""
+        cursor = self.connection.execute(
+            "DELETE FROM ecosystem_stats WHERE name IN ("
+            "SELECT name FROM ecosystem_stats ORDER BY last_used DESC "
+            "LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.evicted += cursor.rowcount
+
+    def close(self):
+        self.evict()
+        self.connection.commit()
+        self.connection.close()
+
+    def print_summary(self):
+        lookups = self.hits + self.misses + self.expired
+        hit_rate = self.hits / lookups * 100 if lookups else 0
+        print("\n=== Ecosystem Stats Cache ===")
+        print(f"Hits: {self.hits} ({hit_rate:.1f}%)")
+        print(f"Misses: {self.misses}")
+        print(f"Expired: {self.expired}")
+        print(f"Evicted: {self.evicted}")
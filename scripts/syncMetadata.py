@@ -1,42 +1,136 @@
+import asyncio
 import datetime
-import os
+import uuid
 
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
+
+from .database import DATABASE_NAME, close_client, get_client
+from .sharding import format_shard
+
+RUN_JOURNAL_ID = "currentRun"
+
+
+def get_run_journal_id(shard: tuple[int, int] | None = None) -> str:
+    """Settings document holding the run journal; each shard keeps its own."""
+    if shard is None:
+        return RUN_JOURNAL_ID
+    return f"{RUN_JOURNAL_ID}:{format_shard(shard)}"
 
 
 class SyncMetadata:
-    def __init__(self):
-        self.client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
-        self.db = self.client["npm-leaderboard"]
+    def __init__(
+        self,
+        client: AsyncMongoClient | None = None,
+        shard: tuple[int, int] | None = None,
+    ):
+        self.client = client or get_client()
+        self.db = self.client[DATABASE_NAME]
         # We'll store our sync metadata in a collection called "settings"
         self.settings_collection = self.db["settings"]
+        self.run_journal_id = get_run_journal_id(shard)
 
-    def update_last_sync(self, sync_date: datetime.datetime | None = None):
+    async def update_last_sync(self, sync_date: datetime.datetime | None = None):
         """
         Update the last sync date in the database.
         If sync_date is None, the current datetime is used.
         """
         if sync_date is None:
             sync_date = datetime.datetime.now()
-        self.settings_collection.update_one(
+        await self.settings_collection.update_one(
             {"_id": "lastSync"}, {"$set": {"date": sync_date}}, upsert=True
         )
         print(f"Last sync date updated to {sync_date}")
 
-    def get_last_sync(self):
+    async def get_last_sync(self):
         """
         Retrieve the last sync date from the database.
         Returns None if the sync date hasn't been set.
         """
-        doc = self.settings_collection.find_one({"_id": "lastSync"})
+        doc = await self.settings_collection.find_one({"_id": "lastSync"})
         if doc:
             return doc.get("date")
         return None
 
+    async def update_changes_feed_state(self, seq, pending_names: list | None = None):
+        """
+        Store the registry changes feed position reached by the last run.
+        `pending_names` are changed packages whose refresh failed and should be
+        retried by the next incremental run.
+        """
+        await self.settings_collection.update_one(
+            {"_id": "changesFeed"},
+            {"$set": {"seq": seq, "pending": sorted(pending_names or [])}},
+            upsert=True,
+        )
+        print(f"Changes feed sequence updated to {seq}")
 
-if __name__ == "__main__":
+    async def get_changes_feed_state(self):
+        """
+        Retrieve the stored changes feed position as (seq, pending_names).
+        Returns (None, []) if no incremental run has completed yet.
+        """
+        doc = await self.settings_collection.find_one({"_id": "changesFeed"})
+        if doc:
+            return doc.get("seq"), doc.get("pending", [])
+        return None, []
+
+    async def update_top_ranking(self, names: list):
+        """Store the latest complete top-package ranking for the next diff."""
+        await self.settings_collection.update_one(
+            {"_id": "topRanking"},
+            {"$set": {"names": names, "date": datetime.datetime.now()}},
+            upsert=True,
+        )
+
+    async def get_top_ranking(self):
+        """Retrieve the stored ranking, or None if none was stored yet."""
+        doc = await self.settings_collection.find_one({"_id": "topRanking"})
+        if doc:
+            return doc.get("names")
+        return None
+
+    async def get_current_run(self):
+        """
+        Retrieve the journal of the weekly run in progress.
+        Returns None if the last run finished (or none ever started).
+        """
+        return await self.settings_collection.find_one({"_id": self.run_journal_id})
+
+    async def start_run(self):
+        """Start a new run journal and return it."""
+        run = {
+            "_id": self.run_journal_id,
+            "run_id": uuid.uuid4().hex,
+            "phase": "fetch_packages",
+            "started_at": datetime.datetime.now(),
+        }
+        await self.settings_collection.replace_one(
+            {"_id": self.run_journal_id}, run, upsert=True
+        )
+        print(f"Started run {run['run_id']}")
+        return run
+
+    async def update_run(self, **fields):
+        """Record progress (phase, fetched package list, ...) in the run journal."""
+        await self.settings_collection.update_one(
+            {"_id": self.run_journal_id}, {"$set": fields}
+        )
+
+    async def finish_run(self):
+        """Clear the run journal once the whole run has completed."""
+        await self.settings_collection.delete_one({"_id": self.run_journal_id})
+
+
+async def main():
     # Test the SyncMetadata functionality
     sync = SyncMetadata()
-    sync.update_last_sync()
-    last_sync = sync.get_last_sync()
-    print("Retrieved last sync date:", last_sync)
+    try:
+        await sync.update_last_sync()
+        last_sync = await sync.get_last_sync()
+        print("Retrieved last sync date:", last_sync)
+    finally:
+        await close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from ..benchmarks.fakeMongo import FakeMongoClient
+from ..benchmarks.upstreamSimulator import UpstreamSimulator, point_at_simulator
+from ..changesFeed import RegistryChangesFeed
+from ..httpClient import RateLimitedSession
+from ..packageIngester import NPMPackageIngester
+from ..retryPolicy import RetryPolicy, UpstreamError
+from ..syncMetadata import SyncMetadata
+from .stubServer import serve
+
+NO_WAIT_RETRIES = RetryPolicy(max_attempts=3, base_delay=0)
+
+
+class FlakyFeedSimulator(UpstreamSimulator):
+    """Stand-in upstream whose changes feed fails its first `feed_failures` requests."""
+
+    def __init__(self, feed_failures: int = 0, **kwargs):
+        super().__init__(latency=0, jitter=0, **kwargs)
+        self.feed_failures = feed_failures
+
+    async def simulate(self, endpoint: str):
+        await super().simulate(endpoint)
+        if endpoint == "changes" and self.feed_failures > 0:
+            self.feed_failures -= 1
+            return web.Response(status=503)
+        return None
+
+
+async def read_feed(simulator: UpstreamSimulator, since, page_size: int = 2):
+    async with serve(simulator.make_app()) as base_url, aiohttp.ClientSession() as s:
+        feed = RegistryChangesFeed(
+            f"{base_url}/changes", page_size=page_size, retry_policy=NO_WAIT_RETRIES
+        )
+        session = RateLimitedSession(s)
+        return (
+            await feed.get_current_seq(session),
+            await feed.fetch_changed_names(session, since),
+        )
+
+
+async def run_incremental_ingest(
+    simulator: UpstreamSimulator, client: FakeMongoClient, top_names
+):
+    async with serve(simulator.make_app()) as base_url:
+        ingester = NPMPackageIngester(
+            client=client, stats_cache_dir=None, metrics_dir=None
+        )
+        point_at_simulator(ingester, base_url)
+        ingester.changes_feed.retry_policy = NO_WAIT_RETRIES
+        await ingester.ingest_packages(top_names, incremental=True)
+        return ingester
+
+
+def test_pages_through_changes_and_skips_design_documents():
+    simulator = FlakyFeedSimulator(changed_names=["a", "_design/app", "b", "a", "c"])
+    current_seq, (names, last_seq) = asyncio.run(read_feed(simulator, since=1))
+    assert current_seq == 5
+    assert names == {"a", "b", "c"}
+    assert last_seq == 5
+
+
+def test_retries_transient_feed_errors():
+    simulator = FlakyFeedSimulator(feed_failures=2, changed_names=["a"])
+    _, (names, last_seq) = asyncio.run(read_feed(simulator, since=0))
+    assert names == {"a"}
+    assert last_seq == 1
+
+
+def test_raises_upstream_error_once_retries_run_out():
+    simulator = FlakyFeedSimulator(feed_failures=100)
+    with pytest.raises(UpstreamError) as error:
+        asyncio.run(read_feed(simulator, since=0))
+    assert error.value.status == 503
+    assert simulator.request_counts["changes"] == NO_WAIT_RETRIES.max_attempts
+
+
+def test_incremental_run_only_refetches_changed_metadata(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeMongoClient()
+    simulator = FlakyFeedSimulator(changed_names=["pkg-1", "not-tracked"])
+
+    async def run():
+        await run_incremental_ingest(simulator, client, ["pkg-1", "pkg-2"])
+        # The second run reads the feed from where the first one stopped
+        ingester = await run_incremental_ingest(simulator, client, [])
+        return ingester, await SyncMetadata(client=client).get_changes_feed_state()
+
+    ingester, feed_state = asyncio.run(run())
+    assert ingester.metadata_names == set()
+    assert ingester.metadata_skipped_count == 2
+    assert ingester.updated_count == 2
+    assert feed_state == (2, [])
+
+    simulator.changed_names.append("pkg-2")
+
+    async def run_after_change():
+        return await run_incremental_ingest(simulator, client, [])
+
+    ingester = asyncio.run(run_after_change())
+    assert ingester.metadata_names == {"pkg-2"}
+    assert ingester.metadata_skipped_count == 1
+
+
+def test_feed_outage_falls_back_to_a_full_refresh(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeMongoClient()
+    simulator = FlakyFeedSimulator(changed_names=["pkg-1"])
+
+    async def run():
+        await run_incremental_ingest(simulator, client, ["pkg-1", "pkg-2"])
+        sync = SyncMetadata(client=client)
+        await sync.update_changes_feed_state(0, ["pkg-9"])
+        simulator.feed_failures = 100
+        ingester = await run_incremental_ingest(simulator, client, [])
+        return ingester, await sync.get_changes_feed_state()
+
+    ingester, feed_state = asyncio.run(run())
+    assert ingester.metadata_names is None
+    assert ingester.changes_seq is None
+    assert ingester.metadata_skipped_count == 0
+    assert ingester.updated_count == 2
+    assert not ingester.failed_packages
+    # The stored position and pending names wait for the next run
+    assert feed_state == (0, ["pkg-9"])
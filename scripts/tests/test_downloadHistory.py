@@ -0,0 +1,123 @@
+import asyncio
+import datetime
+
+import aiohttp
+
+from ..benchmarks.upstreamSimulator import UpstreamSimulator
+from ..downloadHistory import (
+    HISTORY_DAYS,
+    REFETCH_DAYS,
+    DownloadHistory,
+    pack_counts,
+    unpack_counts,
+)
+from ..downloadTrends import DownloadTrendsFetcher, get_week_boundaries
+from ..httpClient import RateLimitedSession
+from .stubServer import serve
+
+DAY = datetime.timedelta(days=1)
+
+
+def days(start: datetime.date, *counts):
+    return [
+        {"day": (start + i * DAY).isoformat(), "downloads": count}
+        for i, count in enumerate(counts)
+    ]
+
+
+class RecordingFetcher(DownloadTrendsFetcher):
+    """Trends fetcher that records the date range of every request."""
+
+    def __init__(self, downloads_url: str):
+        super().__init__(downloads_url)
+        self.ranges = []
+
+    async def fetch_range(self, session, names, start_date, end_date):
+        self.ranges.append((tuple(names), start_date, end_date))
+        return await super().fetch_range(session, names, start_date, end_date)
+
+
+async def fetch_trends(simulator: UpstreamSimulator, names, histories):
+    async with serve(simulator.make_app()) as base_url, aiohttp.ClientSession() as s:
+        fetcher = RecordingFetcher(f"{base_url}/downloads")
+        results = await fetcher.fetch_trends(RateLimitedSession(s), names, histories)
+        return fetcher, results
+
+
+def test_counts_round_trip_through_the_packed_format():
+    counts = [0, 1, 2**32 - 1, 123456]
+    assert len(pack_counts(counts)) == 4 * len(counts)
+    assert unpack_counts(pack_counts(counts)) == counts
+
+
+def test_extend_appends_overwrites_and_fills_gaps():
+    start = datetime.date(2025, 1, 1)
+    history = DownloadHistory()
+    history.extend(days(start, 5, 6, 7))
+    assert (history.start, history.end) == (start, start + 2 * DAY)
+
+    # Overlapping days are overwritten, skipped days count as 0, older days
+    # than the history's start are ignored
+    history.extend(days(start - DAY, 99) + days(start + 2 * DAY, 8, 9))
+    history.extend(days(start + 6 * DAY, 10))
+    assert history.counts == [5, 6, 8, 9, 0, 0, 10]
+
+
+def test_trim_drops_days_before_the_first_kept_day():
+    start = datetime.date(2025, 1, 1)
+    history = DownloadHistory(start, [1, 2, 3, 4])
+    history.trim(start + 2 * DAY)
+    assert (history.start, history.counts) == (start + 2 * DAY, [3, 4])
+    history.trim(start + 10 * DAY)
+    assert (history.start, history.end, history.counts) == (None, None, [])
+
+
+def test_daily_downloads_is_clipped_to_stored_days():
+    start = datetime.date(2025, 1, 1)
+    history = DownloadHistory(start, [1, 2, 3])
+    assert history.daily_downloads(start - 5 * DAY, start + DAY) == days(start, 1, 2)
+    assert DownloadHistory().daily_downloads(start, start) == []
+
+
+def test_only_new_days_and_the_refetch_overlap_are_requested():
+    simulator = UpstreamSimulator(latency=0, jitter=0)
+    start_date, end_date = (day.date() for day in get_week_boundaries())
+    stored_end = end_date - 4 * DAY
+    stored_start = stored_end - 59 * DAY
+    # The latest stored days were still incomplete (0) when they were stored
+    stored = DownloadHistory(stored_start, [7] * 57 + [0] * 3)
+
+    fetcher, results = asyncio.run(
+        fetch_trends(
+            simulator,
+            ["stored", "new", "up-to-date"],
+            {"stored": stored, "up-to-date": DownloadHistory(end_date, [1])},
+        )
+    )
+    assert sorted(fetcher.ranges) == [
+        (("new",), start_date, end_date),
+        (("stored",), stored_end - (REFETCH_DAYS - 1) * DAY, end_date),
+    ]
+    history = results["stored"]["history"]
+    assert (history.start, history.end) == (stored_start, end_date)
+    assert history.daily_downloads(stored_end - 2 * DAY, end_date) == (
+        simulator.daily_downloads(
+            "stored", (stored_end - 2 * DAY).isoformat(), end_date.isoformat()
+        )
+    )
+    assert len(results["stored"]["weekly_trends"]) == 8
+    assert results["new"]["history"].start == start_date
+    # Nothing was fetched, so there is nothing new to save
+    assert results["up-to-date"]["history"] is None
+
+
+def test_history_is_trimmed_to_the_kept_window():
+    simulator = UpstreamSimulator(latency=0, jitter=0)
+    _, end_date = (day.date() for day in get_week_boundaries())
+    old_start = end_date - (HISTORY_DAYS + 9) * DAY
+    stored = DownloadHistory(old_start, [1] * (HISTORY_DAYS + 9))
+
+    _, results = asyncio.run(fetch_trends(simulator, ["stored"], {"stored": stored}))
+    history = results["stored"]["history"]
+    assert history.start == end_date - (HISTORY_DAYS - 1) * DAY
+    assert len(history.counts) == HISTORY_DAYS
@@ -0,0 +1,80 @@
+import datetime
+import random
+
+import pytest
+
+from ..downloadTrends import compute_growth_metrics
+
+
+def route_avg_growth(weekly_trends):
+    """
+    The avgGrowth of the API's former `sortBy=growth` aggregation
+    (src/app/api/packages/route.ts), stage by stage.
+    """
+    weekly_downloads = [week["downloads"] for week in weekly_trends]  # $map
+    full_weekly_downloads = weekly_downloads[: len(weekly_downloads) - 1]  # $slice
+    if len(full_weekly_downloads) > 1:
+        growth_percentages = [
+            (
+                0
+                if full_weekly_downloads[i - 1] == 0
+                else (full_weekly_downloads[i] - full_weekly_downloads[i - 1])
+                / full_weekly_downloads[i - 1]
+                * 100
+            )
+            for i in range(1, len(full_weekly_downloads))  # $range
+        ]
+    else:
+        growth_percentages = []
+    if len(growth_percentages) > 0:
+        return sum(growth_percentages) / len(growth_percentages)  # $avg
+    return 0
+
+
+def weeks(*downloads):
+    first_sunday = datetime.date(2025, 1, 5)
+    return [
+        {
+            "week_ending": (first_sunday + datetime.timedelta(weeks=i)).isoformat(),
+            "downloads": count,
+        }
+        for i, count in enumerate(downloads)
+    ]
+
+
+def test_growth_leaves_out_the_latest_week():
+    growth = compute_growth_metrics(weeks(100, 200, 100, 999))
+    assert growth == {
+        "avgGrowth": 25.0,
+        "lastWeekGrowth": -50.0,
+        "weeklyDownloadDelta": -100,
+    }
+
+
+def test_growth_after_a_zero_week_counts_as_zero():
+    growth = compute_growth_metrics(weeks(0, 50, 100, 1))
+    assert growth == {
+        "avgGrowth": 50.0,
+        "lastWeekGrowth": 100.0,
+        "weeklyDownloadDelta": 50,
+    }
+
+
+@pytest.mark.parametrize("week_count", [0, 1, 2])
+def test_too_few_weeks_have_no_growth(week_count):
+    growth = compute_growth_metrics(weeks(*[10, 20][:week_count]))
+    assert growth == {"avgGrowth": 0, "lastWeekGrowth": 0, "weeklyDownloadDelta": 0}
+
+
+def test_avg_growth_matches_the_former_api_aggregation():
+    rng = random.Random(0)
+    for _ in range(500):
+        weekly_trends = weeks(
+            *(
+                rng.choice([0, rng.randrange(1, 10**6)])
+                for _ in range(rng.randrange(2, 10))
+            )
+        )
+        assert compute_growth_metrics(weekly_trends)["avgGrowth"] == pytest.approx(
+            route_avg_growth(weekly_trends)
+        )
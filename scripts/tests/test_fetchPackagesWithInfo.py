@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from ..benchmarks.upstreamSimulator import UpstreamSimulator, point_at_simulator
+from ..fetchPackagesWithInfo import (
+    TopPackagesFetcher,
+    diff_rankings,
+    load_ranking,
+    rank_names,
+)
+from ..retryPolicy import RetryPolicy
+from .stubServer import serve
+
+
+class MissingPageSimulator(UpstreamSimulator):
+    """Stand-in ecosyste.ms whose package_names page `missing_page` always fails."""
+
+    def __init__(self, missing_page: int, **kwargs):
+        super().__init__(latency=0, jitter=0, **kwargs)
+        self.missing_page = missing_page
+
+    async def package_names(self, request: web.Request):
+        if int(request.query.get("page", 1)) == self.missing_page:
+            return web.Response(status=503)
+        return await super().package_names(request)
+
+
+async def fetch_ranking(simulator: UpstreamSimulator, output_file: str):
+    async with serve(simulator.make_app()) as base_url:
+        fetcher = TopPackagesFetcher(output_file=output_file, depth=3000)
+        point_at_simulator(fetcher, base_url)
+        fetcher.retry_policy = RetryPolicy(max_attempts=2, base_delay=0)
+        await fetcher.fetch_all_packages()
+        return fetcher
+
+
+def test_missing_page_does_not_move_later_names(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    previous = [f"pkg-{rank}" for rank in range(3000)]
+    simulator = MissingPageSimulator(missing_page=2, total_names=3000)
+    fetcher = asyncio.run(fetch_ranking(simulator, "data/names.ndjson"))
+
+    assert fetcher.missing_pages == [2]
+    assert fetcher.ranks["pkg-2000"] == 2000
+    diff = diff_rankings(rank_names(previous), fetcher.ranks, complete=False)
+    assert diff == {"entered": [], "left": None, "moved": []}
+    # The NDJSON file ranks names the same way
+    assert load_ranking("data/names.ndjson") == fetcher.ranks
+
+
+def test_diff_reports_entries_exits_and_moves(tmp_path):
+    path = tmp_path / "previous.ndjson"
+    records = [
+        {"page": 1, "per_page": 2, "names": ["a", "b"]},
+        {"page": 2, "per_page": 2, "names": ["c", "d"]},
+    ]
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    diff = diff_rankings(load_ranking(str(path)), rank_names(["b", "a", "c", "e"]))
+    assert diff["entered"] == ["e"]
+    assert diff["left"] == ["d"]
+    assert diff["moved"] == [("b", 1, 0), ("a", 0, 1)]
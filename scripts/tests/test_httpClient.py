@@ -0,0 +1,129 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from ..benchmarks.upstreamSimulator import UpstreamSimulator
+from ..httpClient import RateLimitedSession
+from .stubServer import serve
+
+
+class CountingSimulator(UpstreamSimulator):
+    """Stand-in upstream that records the most requests it served at once."""
+
+    def __init__(self, **kwargs):
+        super().__init__(jitter=0, **kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def simulate(self, endpoint: str):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().simulate(endpoint)
+        finally:
+            self.in_flight -= 1
+
+
+async def run_requests(simulator: UpstreamSimulator, requests, **limits):
+    """
+    Serve `simulator` and call `requests(session, url)`; returns the host's
+    limiter afterwards. `limits` configure the limiter of the stub's host.
+    """
+    async with serve(simulator.make_app()) as base_url, aiohttp.ClientSession() as s:
+        host = urlsplit(base_url).netloc
+        session = RateLimitedSession(s, host_limits={host: limits})
+        await requests(session, f"{base_url}/ecosystems/packages/pkg")
+        return session.get_limiter(base_url)
+
+
+async def get(session: RateLimitedSession, url: str) -> int:
+    async with session.get(url) as response:
+        return response.status
+
+
+def test_throttling_halves_the_limit_once_per_interval():
+    simulator = CountingSimulator(latency=0, throttle_rate=1.0, retry_after=0)
+
+    async def requests(session, url):
+        assert await get(session, url) == 429
+        assert await get(session, url) == 429
+
+    limiter = asyncio.run(
+        run_requests(simulator, requests, initial_limit=8, decrease_interval=60)
+    )
+    # The second 429 arrived within the same decrease interval
+    assert limiter.limit == 4
+    assert limiter.throttled_count == 2
+
+    limiter = asyncio.run(
+        run_requests(simulator, requests, initial_limit=8, decrease_interval=0)
+    )
+    assert limiter.limit == 2
+
+
+def test_successes_grow_the_limit_additively_up_to_the_cap():
+    simulator = CountingSimulator(latency=0)
+
+    def sequential(count):
+        async def requests(session, url):
+            for _ in range(count):
+                assert await get(session, url) == 200
+
+        return requests
+
+    async def run():
+        # About +1 per round of `limit` successful responses
+        one_round = await run_requests(
+            simulator, sequential(4), initial_limit=4, max_limit=10
+        )
+        many_rounds = await run_requests(
+            simulator, sequential(200), initial_limit=4, max_limit=10
+        )
+        return one_round, many_rounds
+
+    one_round, many_rounds = asyncio.run(run())
+    assert 4.5 < one_round.limit < 5
+    assert many_rounds.limit == 10
+
+
+def test_retry_after_pauses_the_host():
+    simulator = CountingSimulator(latency=0, throttle_rate=1.0, retry_after=1)
+    waits = []
+
+    async def requests(session, url):
+        assert await get(session, url) == 429
+        assert 0.5 < session.get_pause_remaining() <= 1
+        simulator.throttle_rate = 0
+        start = time.monotonic()
+        assert await get(session, url) == 200
+        waits.append(time.monotonic() - start)
+
+    asyncio.run(run_requests(simulator, requests, initial_limit=4))
+    assert waits[0] >= 0.9
+
+
+def test_concurrency_never_exceeds_the_limit():
+    # Slow responses, some throttled, from many concurrent callers
+    simulator = CountingSimulator(latency=0.02, throttle_rate=0.3, retry_after=0)
+    in_flight_seen = []
+
+    async def requests(session, url):
+        limiter = session.get_limiter(url)
+
+        async def request():
+            async with session.get(url):
+                in_flight_seen.append(limiter.in_flight)
+
+        await asyncio.gather(*(request() for _ in range(200)))
+
+    limiter = asyncio.run(
+        run_requests(
+            simulator, requests, initial_limit=6, max_limit=6, decrease_interval=0
+        )
+    )
+    assert simulator.max_in_flight <= 6
+    assert limiter.throttled_count > 0
+    assert limiter.in_flight == 0
+    assert max(in_flight_seen) <= 6
@@ -0,0 +1,56 @@
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from ..keywords import normalize_keywords
+
+KEYWORDS_TS = Path(__file__).parents[2] / "lib" / "keywords.ts"
+
+CASES = [
+    (["React", "reacts", " Hooks ", "hook"], ["react", "hook"]),
+    (["CSS", "Utils", "utils", "util"], ["cs", "util"]),
+    (["s", "ss", "S", "", "   "], ["s"]),
+    (["ΣΑΣ", "Straße", "İs"], ["σας", "straße", "i̇"]),
+    # Trimmed like String.prototype.trim, not like str.strip
+    (["\ufeffcli", "\u3000api\xa0", "\x1ctool"], ["cli", "api", "\x1ctool"]),
+    (["a b", "a\tb "], ["a b", "a\tb"]),
+]
+
+
+@pytest.mark.parametrize("keywords, expected", CASES)
+def test_normalize_keywords(keywords, expected):
+    assert normalize_keywords(keywords) == expected
+
+
+def test_string_and_invalid_keywords():
+    assert normalize_keywords("CLI, tools  json") == ["cli", "tool", "json"]
+    assert normalize_keywords(["cli", 3, None]) == ["cli"]
+    assert normalize_keywords(None) == []
+    assert normalize_keywords({"cli": 1}) == []
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_matches_the_api_mirror(tmp_path):
+    # Run lib/keywords.ts as plain JavaScript: its only TypeScript syntax is
+    # the string type annotations
+    source = re.sub(r": *string(\[\])?", "", KEYWORDS_TS.read_text())
+    script = tmp_path / "keywords.mjs"
+    script.write_text(
+        source
+        + "\nimport { readFileSync } from 'node:fs';\n"
+        + "const input = JSON.parse(readFileSync(0, 'utf8'));\n"
+        + "console.log(JSON.stringify(input.map(normalizeKeywords)));\n"
+    )
+    inputs = [keywords for keywords, _ in CASES]
+    output = subprocess.run(
+        ["node", str(script)],
+        input=json.dumps(inputs),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert json.loads(output) == [normalize_keywords(keywords) for keywords in inputs]
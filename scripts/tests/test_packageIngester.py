@@ -0,0 +1,194 @@
+import asyncio
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+
+from pymongo.errors import BulkWriteError
+
+from ..benchmarks.fakeMongo import FakeCollection, FakeMongoClient
+from ..benchmarks.upstreamSimulator import UpstreamSimulator, point_at_simulator
+from ..database import DATABASE_NAME
+from ..packageIngester import NPMPackageIngester
+from ..retryPolicy import UpstreamError
+from ..reverseDependencies import ReverseDependencyIndex
+from ..syncMetadata import SyncMetadata
+from .stubServer import serve
+
+
+class RejectingCollection(FakeCollection):
+    """Fake collection that rejects the upserts of `rejected_names`."""
+
+    def __init__(self, name: str, rejected_names: set):
+        super().__init__(name)
+        self.rejected_names = rejected_names
+
+    async def bulk_write(self, operations, ordered: bool = True):
+        write_errors = [
+            {"index": index, "errmsg": "rejected"}
+            for index, operation in enumerate(operations)
+            if operation._filter.get("name") in self.rejected_names
+        ]
+        await super().bulk_write(
+            [
+                operation
+                for index, operation in enumerate(operations)
+                if index not in {error["index"] for error in write_errors}
+            ]
+        )
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors})
+
+
+class CrashedPool(Executor):
+    """Executor in the state a pool is left in after a worker crashed."""
+
+    def submit(self, fn, *args, **kwargs):
+        raise BrokenProcessPool("A process in the process pool was terminated")
+
+
+class CrashingPoolIngester(NPMPackageIngester):
+    """Ingester whose first parse pool is broken."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.pools_made = 0
+
+    def make_parse_executor(self) -> Executor:
+        self.pools_made += 1
+        if self.pools_made == 1:
+            return CrashedPool()
+        return super().make_parse_executor()
+
+
+class FailingEdgeIndex(ReverseDependencyIndex):
+    """Reverse-dependency index whose first `failures` updates raise `error`."""
+
+    def __init__(self, collection, error: Exception, failures: int = 1):
+        super().__init__(collection)
+        self.error = error
+        self.failures = failures
+
+    async def update_package(self, package_name, dependencies, peer_dependencies):
+        if self.failures > 0:
+            self.failures -= 1
+            raise self.error
+        await super().update_package(package_name, dependencies, peer_dependencies)
+
+
+async def ingest_with_parse_pool(ingester_class, client, names):
+    simulator = UpstreamSimulator(latency=0, jitter=0)
+    async with serve(simulator.make_app()) as base_url:
+        ingester = ingester_class(
+            client=client,
+            stats_cache_dir=None,
+            metrics_dir=None,
+            parse_workers=2,
+            # Every packument body goes to the pool
+            parse_offload_bytes=1,
+        )
+        point_at_simulator(ingester, base_url)
+        await ingester.ingest_packages(names)
+        return ingester
+
+
+def test_packuments_are_parsed_in_the_pool(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeMongoClient()
+    names = [f"pkg-{i}" for i in range(20)]
+    ingester = asyncio.run(ingest_with_parse_pool(NPMPackageIngester, client, names))
+    assert not ingester.failed_packages
+    assert ingester.parse_executor is None
+    packages = client[DATABASE_NAME]["packages"].docs.values()
+    assert all(doc["latest_version"] for doc in packages)
+
+
+def test_broken_parse_pool_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    names = [f"pkg-{i}" for i in range(20)]
+    ingester = asyncio.run(
+        ingest_with_parse_pool(CrashingPoolIngester, FakeMongoClient(), names)
+    )
+    assert not ingester.failed_packages
+    assert len(ingester.new_names) == 20
+    assert ingester.pools_made == 2
+    restarts = ingester.metrics.to_dict()["parse_pool_restarts_total"]
+    assert restarts == [{"labels": {}, "value": 1}]
+
+
+def test_rejected_write_is_not_counted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeMongoClient()
+    client[DATABASE_NAME]["packages"] = RejectingCollection("packages", {"pkg-2"})
+    simulator = UpstreamSimulator(latency=0, jitter=0)
+
+    async def run():
+        async with serve(simulator.make_app()) as base_url:
+            ingester = NPMPackageIngester(
+                client=client, stats_cache_dir=None, metrics_dir=None
+            )
+            point_at_simulator(ingester, base_url)
+            # Every upsert flushes as soon as it is queued
+            ingester.write_sink.max_batch_size = 1
+            await ingester.ingest_packages(["pkg-1", "pkg-2"])
+            return ingester
+
+    ingester = asyncio.run(run())
+    assert ingester.new_names == {"pkg-1"}
+    assert ingester.updated_count == 0
+    assert [failure["package"] for failure in ingester.failed_packages] == ["pkg-2"]
+
+
+def test_run_without_work_still_finishes_the_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeMongoClient()
+    simulator = UpstreamSimulator(latency=0, jitter=0, changed_names=["a", "b"])
+
+    async def run():
+        async with serve(simulator.make_app()) as base_url:
+            ingester = NPMPackageIngester(client=client, stats_cache_dir=None)
+            point_at_simulator(ingester, base_url)
+            await ingester.ingest_packages([], incremental=True)
+        return await SyncMetadata(client=client).get_changes_feed_state()
+
+    assert asyncio.run(run()) == (2, [])
+    assert (tmp_path / "data" / "metrics" / "ingest.prom").exists()
+
+
+def ingest_with_failing_edges(client, error: Exception):
+    simulator = UpstreamSimulator(latency=0, jitter=0)
+
+    async def run():
+        await client[DATABASE_NAME]["packages"].insert_one({"name": "pkg-1"})
+        async with serve(simulator.make_app()) as base_url:
+            ingester = NPMPackageIngester(
+                client=client, stats_cache_dir=None, metrics_dir=None
+            )
+            point_at_simulator(ingester, base_url)
+            ingester.retry_pass_delay = 0
+            ingester.reverse_dependencies = FailingEdgeIndex(
+                client[DATABASE_NAME]["dependents"], error
+            )
+            await ingester.ingest_packages()
+            return ingester
+
+    return asyncio.run(run())
+
+
+def test_failed_edge_update_is_not_counted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeMongoClient()
+    ingester = ingest_with_failing_edges(client, ValueError("bad dependencies"))
+    assert ingester.updated_count == 0
+    assert [failure["package"] for failure in ingester.failed_packages] == ["pkg-1"]
+    # The package's upsert was never queued
+    [doc] = client[DATABASE_NAME]["packages"].docs.values()
+    assert "db_updated_at" not in doc
+
+
+def test_deferred_edge_update_is_counted_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ingester = ingest_with_failing_edges(
+        FakeMongoClient(), UpstreamError("connection reset")
+    )
+    assert not ingester.failed_packages
+    assert ingester.updated_count == 1
+    assert ingester.recovered_names == {"pkg-1"}
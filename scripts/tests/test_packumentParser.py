@@ -0,0 +1,42 @@
+import io
+import json
+
+import pytest
+
+from ..packumentParser import parse_packument_file, summarize_packument
+from ..upstreamSchemas import decode_packument
+
+
+def make_packument(**fields) -> bytes:
+    packument = {
+        "dist-tags": {"latest": "1.0.0"},
+        "versions": {"1.0.0": {"dependencies": {"a": "^1"}}},
+        **fields,
+    }
+    return json.dumps(packument).encode()
+
+
+@pytest.mark.parametrize(
+    "keywords, expected",
+    [
+        (["cli", "json"], ["cli", "json"]),
+        (["cli", 3, None, {"x": "y"}, ["nested"]], ["cli"]),
+        ("cli, json", "cli, json"),
+        (None, None),
+        (3, None),
+        (True, None),
+        ({"first": "cli"}, None),
+    ],
+)
+def test_every_parser_cleans_keywords_the_same_way(keywords, expected):
+    body = make_packument(keywords=keywords)
+    assert parse_packument_file(io.BytesIO(body))["keywords"] == expected
+    assert decode_packument(body)["keywords"] == expected
+    assert summarize_packument(json.loads(body))["keywords"] == expected
+
+
+def test_missing_keywords_are_an_empty_list():
+    body = make_packument()
+    assert parse_packument_file(io.BytesIO(body))["keywords"] == []
+    assert decode_packument(body)["keywords"] == []
+    assert summarize_packument(json.loads(body))["keywords"] == []
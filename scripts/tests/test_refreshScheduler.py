@@ -0,0 +1,140 @@
+import asyncio
+import datetime
+
+import pytest
+from aiohttp import web
+
+from ..benchmarks.fakeMongo import FakeMongoClient
+from ..benchmarks.upstreamSimulator import UpstreamSimulator, point_at_simulator
+from ..database import DATABASE_NAME
+from ..packageIngester import NPMPackageIngester
+from ..refreshScheduler import (
+    DUE_GRACE,
+    MAX_STALENESS,
+    TIER_INTERVALS,
+    RefreshScheduler,
+)
+from .stubServer import serve
+
+
+class NullDownloadsSimulator(UpstreamSimulator):
+    """Stand-in ecosyste.ms that has no download count for any package."""
+
+    def __init__(self, **kwargs):
+        super().__init__(latency=0, jitter=0, **kwargs)
+
+    async def ecosystem_package(self, request: web.Request):
+        return web.json_response(
+            {
+                "name": request.match_info["name"],
+                "downloads": None,
+                "dependent_packages_count": 3,
+                "dependent_repos_count": 7,
+            }
+        )
+
+
+NOW = datetime.datetime(2025, 6, 1, 3, 0)
+
+
+def make_scheduler() -> RefreshScheduler:
+    scheduler = RefreshScheduler(now=NOW, hot_rank=2, warm_rank=4)
+    scheduler.set_ranks(
+        [{"name": f"pkg-{i}", "downloads": {"total": 1000 - i}} for i in range(6)]
+        + [{"name": "no-downloads", "downloads": {"total": None}}]
+    )
+    return scheduler
+
+
+def stored(tier: str, due_in: datetime.timedelta, updated_ago: datetime.timedelta):
+    return {
+        "refresh": {"tier": tier, "next_due_at": NOW + due_in},
+        "db_updated_at": NOW - updated_ago,
+    }
+
+
+def test_ranks_follow_total_downloads():
+    scheduler = make_scheduler()
+    assert scheduler.ranks["pkg-0"] == 0
+    assert scheduler.ranks["pkg-5"] == 5
+    assert scheduler.ranks["no-downloads"] == 6
+
+
+@pytest.mark.parametrize(
+    "name, total, growth, changed, tier",
+    [
+        ("pkg-1", 0, 0.0, False, "hot"),  # Top hot_rank
+        ("pkg-3", 0, 0.0, False, "warm"),  # Top warm_rank
+        ("pkg-5", 0, 0.0, False, "cold"),
+        ("pkg-5", 100_000, 0.0, False, "warm"),  # warm_downloads
+        ("pkg-5", 0, -25.0, False, "hot"),  # Volatile growth
+        ("pkg-5", 0, 24.9, False, "cold"),
+        ("pkg-5", 0, 0.0, True, "hot"),  # Metadata changed
+        ("new-pkg", 0, 0.0, False, "cold"),  # Not ranked yet
+    ],
+)
+def test_assign_tier(name, total, growth, changed, tier):
+    assert make_scheduler().assign_tier(name, total, growth, changed) == tier
+
+
+def test_schedule_sets_the_next_due_time_of_the_tier():
+    scheduler = make_scheduler()
+    for name, tier in (("pkg-0", "hot"), ("pkg-3", "warm"), ("pkg-5", "cold")):
+        assert scheduler.schedule(name, 0, 0.0, False) == {
+            "refresh": {"tier": tier, "next_due_at": NOW + TIER_INTERVALS[tier]}
+        }
+
+
+def test_due_packages():
+    scheduler = make_scheduler()
+    week = datetime.timedelta(days=7)
+    hour = datetime.timedelta(hours=1)
+    assert scheduler.is_due({"name": "unscheduled"})
+    assert scheduler.is_due(stored("hot", -hour, week))
+    # A package written near the end of the last run is still due
+    assert scheduler.is_due(stored("hot", DUE_GRACE - hour, week - hour * 5))
+    assert not scheduler.is_due(stored("cold", DUE_GRACE + hour, week * 3))
+    # Past the maximum staleness, whatever the schedule says
+    assert scheduler.is_due(stored("cold", week * 5, MAX_STALENESS - DUE_GRACE))
+
+
+def test_plan_counts_planned_and_skipped_per_tier():
+    scheduler = make_scheduler()
+    day = datetime.timedelta(days=1)
+    not_due = stored("cold", day * 10, day * 18)
+    assert scheduler.plan("new-pkg", None)
+    assert scheduler.plan("pkg-0", stored("hot", -day, day * 7))
+    assert not scheduler.plan("pkg-5", not_due)
+    assert scheduler.plan("pkg-4", not_due, force=True)
+    assert scheduler.planned == {"new": 1, "hot": 1, "cold": 1}
+    assert scheduler.skipped == {"cold": 1}
+
+    scheduler.record_executed("pkg-0")
+    scheduler.record_executed("pkg-4")
+    scheduler.record_executed("pkg-4", -1)
+    assert scheduler.executed == {"hot": 1, "cold": 0}
+
+
+def test_null_downloads_get_a_tier():
+    scheduler = RefreshScheduler()
+    assert scheduler.assign_tier("pkg", None, 0.0, metadata_changed=False) == "cold"
+
+
+def test_scheduled_run_stores_packages_without_downloads(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeMongoClient()
+
+    async def run():
+        async with serve(NullDownloadsSimulator().make_app()) as base_url:
+            ingester = NPMPackageIngester(
+                client=client, stats_cache_dir=None, metrics_dir=None
+            )
+            point_at_simulator(ingester, base_url)
+            await ingester.ingest_packages(["pkg-1", "pkg-2"], scheduled=True)
+            return ingester
+
+    ingester = asyncio.run(run())
+    assert not ingester.failed_packages
+    assert ingester.new_names == {"pkg-1", "pkg-2"}
+    packages = client[DATABASE_NAME]["packages"].docs.values()
+    assert [doc["refresh"]["tier"] for doc in packages] == ["cold", "cold"]
@@ -0,0 +1,163 @@
+import asyncio
+import email.utils
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from ..benchmarks.fakeMongo import FakeMongoClient
+from ..benchmarks.upstreamSimulator import UpstreamSimulator, point_at_simulator
+from ..httpClient import parse_retry_after
+from ..packageIngester import NPMPackageIngester
+from ..retryPolicy import RetryPolicy, UpstreamError, is_retryable
+from .stubServer import serve
+
+
+class FlakyEcosystemSimulator(UpstreamSimulator):
+    """Stand-in upstream whose ecosyste.ms requests fail `failures` times."""
+
+    def __init__(self, failures: int, **kwargs):
+        super().__init__(latency=0, jitter=0, **kwargs)
+        self.failures = failures
+
+    async def ecosystem_package(self, request: web.Request):
+        if self.failures > 0:
+            self.failures -= 1
+            return web.Response(status=503)
+        return await super().ecosystem_package(request)
+
+
+def run_operation(policy: RetryPolicy, outcomes, monkeypatch):
+    """
+    Run an operation that raises or returns `outcomes` in turn under `policy`.
+    Returns (result or raised error, attempts, retry delays).
+    """
+    attempts = []
+    delays = []
+
+    async def no_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr("scripts.retryPolicy.asyncio.sleep", no_sleep)
+
+    async def operation():
+        outcome = outcomes[len(attempts)]
+        attempts.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    try:
+        result = asyncio.run(policy.run(operation))
+    except Exception as e:
+        result = e
+    return result, len(attempts), delays
+
+
+@pytest.mark.parametrize(
+    "error, retryable",
+    [
+        (UpstreamError("throttled", status=429), True),
+        (UpstreamError("unavailable", status=503), True),
+        (UpstreamError("no response"), True),
+        (UpstreamError("not found", status=404), False),
+        (UpstreamError("bad request", status=400), False),
+        (UpstreamError("not found", status=404, retryable=True), True),
+        (UpstreamError("unavailable", status=503, retryable=False), False),
+        (aiohttp.ClientConnectionError("reset"), True),
+        (asyncio.TimeoutError(), True),
+        (ValueError("malformed"), False),
+    ],
+)
+def test_classifies_errors(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_retries_transient_errors_until_success(monkeypatch):
+    policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=30)
+    outcomes = [UpstreamError("a", status=502), aiohttp.ClientError(), "ok"]
+    result, attempts, delays = run_operation(policy, outcomes, monkeypatch)
+    assert (result, attempts) == ("ok", 3)
+    # Full jitter: at most base_delay * 2**n before attempt n + 2
+    assert 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
+
+
+def test_gives_up_after_max_attempts(monkeypatch):
+    policy = RetryPolicy(max_attempts=2, base_delay=0)
+    outcomes = [UpstreamError("first", status=500), UpstreamError("last", status=500)]
+    result, attempts, _ = run_operation(policy, outcomes, monkeypatch)
+    assert str(result) == "last"
+    assert attempts == 2
+
+
+def test_does_not_retry_permanent_errors(monkeypatch):
+    policy = RetryPolicy(max_attempts=5, base_delay=0)
+    outcomes = [UpstreamError("gone", status=404), "never reached"]
+    result, attempts, delays = run_operation(policy, outcomes, monkeypatch)
+    assert isinstance(result, UpstreamError)
+    assert (attempts, delays) == (1, [])
+
+
+def test_backoff_is_capped_at_max_delay():
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    delays = [policy.get_delay(10, Exception()) for _ in range(200)]
+    assert all(0 <= delay <= 5 for delay in delays)
+    assert max(delays) > 2.5
+
+
+def test_retry_after_is_a_capped_lower_bound():
+    policy = RetryPolicy(base_delay=1, max_delay=5, max_retry_after=60)
+    asked = UpstreamError("throttled", status=429, retry_after=20)
+    assert all(policy.get_delay(0, asked) == 20 for _ in range(50))
+    too_long = UpstreamError("throttled", status=429, retry_after=3600)
+    assert policy.get_delay(0, too_long) == 60
+
+
+def test_parses_retry_after_seconds_and_dates():
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after("-3") == 0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    in_a_minute = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 55 < parse_retry_after(in_a_minute) <= 60
+
+
+def test_upstream_error_from_response_reads_retry_after():
+    async def throttled(request):
+        return web.Response(status=429, headers={"Retry-After": "12"})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/", throttled)
+        async with serve(app) as base_url, aiohttp.ClientSession() as session:
+            async with session.get(base_url) as response:
+                return UpstreamError.from_response("Failed", response)
+
+    error = asyncio.run(run())
+    assert (str(error), error.status, error.retry_after) == ("Failed: 429", 429, 12)
+    assert error.retryable
+
+
+def test_failed_packages_are_retried_at_the_end_of_the_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Every package fails its first (and only) in-run attempt
+    simulator = FlakyEcosystemSimulator(failures=2)
+
+    async def run():
+        async with serve(simulator.make_app()) as base_url:
+            ingester = NPMPackageIngester(
+                client=FakeMongoClient(), stats_cache_dir=None, metrics_dir=None
+            )
+            point_at_simulator(ingester, base_url)
+            ingester.retry_policy = RetryPolicy(max_attempts=1)
+            ingester.retry_pass_delay = 0
+            await ingester.ingest_packages(["pkg-1", "pkg-2"])
+            return ingester
+
+    ingester = asyncio.run(run())
+    assert not ingester.failed_packages
+    assert ingester.new_names == ingester.recovered_names == {"pkg-1", "pkg-2"}
+    # Both failed once, then succeeded in the retry pass
+    assert simulator.failures == 0
+    assert simulator.request_counts["ecosystems"] == 2
@@ -0,0 +1,57 @@
+import asyncio
+
+from ..benchmarks.fakeMongo import FakeMongoClient
+from ..database import DATABASE_NAME
+from ..reverseDependencies import ReverseDependencyIndex
+
+
+def edges(client: FakeMongoClient):
+    return sorted(
+        (doc["dependency"], doc["dependent"], doc["regular"], doc["peer"])
+        for doc in client[DATABASE_NAME]["dependents"].docs.values()
+    )
+
+
+def test_update_replaces_the_edges_of_a_dependent():
+    client = FakeMongoClient()
+    index = ReverseDependencyIndex(client[DATABASE_NAME]["dependents"])
+
+    async def run():
+        await index.update_package("app", ["react", "lodash"], ["react"])
+        await index.update_package("other", ["lodash"], [])
+        await index.flush()
+        first = edges(client)
+        await index.update_package("app", ["lodash", "zod"], [])
+        await index.flush()
+        return first, edges(client)
+
+    first, second = asyncio.run(run())
+    assert first == [
+        ("lodash", "app", True, False),
+        ("lodash", "other", True, False),
+        ("react", "app", True, True),
+    ]
+    # react is gone, zod is new; other's edges are untouched
+    assert second == [
+        ("lodash", "app", True, False),
+        ("lodash", "other", True, False),
+        ("zod", "app", True, False),
+    ]
+
+
+def test_rebuild_deletes_the_edges_of_removed_packages():
+    client = FakeMongoClient()
+    db = client[DATABASE_NAME]
+    index = ReverseDependencyIndex(db["dependents"])
+
+    async def run():
+        await index.update_package("removed", ["lodash"], [])
+        await index.update_package("app", ["react"], [])
+        await index.flush()
+        await db["packages"].insert_one(
+            {"name": "app", "dependencies": ["lodash"], "peerDependencies": None}
+        )
+        await index.rebuild(db["packages"])
+
+    asyncio.run(run())
+    assert edges(client) == [("lodash", "app", True, False)]
@@ -0,0 +1,88 @@
+import asyncio
+
+from ..benchmarks.fakeMongo import FakeMongoClient
+from ..benchmarks.upstreamSimulator import UpstreamSimulator, point_at_simulator
+from ..database import DATABASE_NAME
+from ..packageIngester import NPMPackageIngester
+from ..statsCache import DAY, EcosystemStatsCache
+from .stubServer import serve
+
+STATS = {
+    "total_downloads": 10,
+    "dependent_packages_count": 2,
+    "dependent_repos_count": 3,
+}
+
+
+class Clock:
+    """Stand-in for time.time that tests move forward by hand."""
+
+    def __init__(self, now: float = 1_000_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr("scripts.statsCache.time.time", clock)
+    return EcosystemStatsCache(tmp_path / "stats.sqlite", **kwargs), clock
+
+
+def test_entries_expire_after_their_jittered_ttl(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl=10 * DAY)
+    cache.put("pkg", STATS)
+    ttl = cache.get_ttl("pkg")
+
+    clock.now += ttl - 1
+    assert cache.get("pkg") == STATS
+    clock.now += 2
+    assert cache.get("pkg") is None
+    assert cache.get("other") is None
+    assert (cache.hits, cache.expired, cache.misses) == (1, 1, 1)
+
+
+def test_jitter_spreads_expiry_over_a_quarter_of_the_ttl(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch, ttl=10 * DAY)
+    ttls = {cache.get_ttl(f"pkg-{i}") for i in range(1000)}
+    assert all(10 * DAY <= ttl < 12.5 * DAY for ttl in ttls)
+    assert max(ttls) - min(ttls) > 2 * DAY
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, max_entries=2)
+    for name in ("a", "b", "c"):
+        cache.put(name, STATS)
+        clock.now += 1
+    cache.get("a")
+    cache.close()
+
+    cache = EcosystemStatsCache(tmp_path / "stats.sqlite", max_entries=2)
+    assert cache.get("b") is None
+    assert cache.get("a") == cache.get("c") == STATS
+
+
+def test_hot_packages_bypass_the_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeMongoClient()
+    simulator = UpstreamSimulator(latency=0, jitter=0)
+
+    async def run():
+        packages = client[DATABASE_NAME]["packages"]
+        for name, tier in (("cold-pkg", "cold"), ("hot-pkg", "hot")):
+            await packages.insert_one({"name": name, "refresh": {"tier": tier}})
+        async with serve(simulator.make_app()) as base_url:
+            ingester = NPMPackageIngester(
+                client=client, stats_cache_dir="cache", metrics_dir=None
+            )
+            point_at_simulator(ingester, base_url)
+            ingester.stats_cache.put("cold-pkg", STATS)
+            ingester.stats_cache.put("hot-pkg", STATS)
+            await ingester.ingest_packages()
+            return ingester
+
+    ingester = asyncio.run(run())
+    assert not ingester.failed_packages
+    assert simulator.request_counts["ecosystems"] == 1
+    assert ingester.stats_cache.hits == 1
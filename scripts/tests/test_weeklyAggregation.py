@@ -0,0 +1,70 @@
+import datetime
+import random
+
+import pytest
+
+from ..downloadTrends import compute_growth_metrics, group_weekly_downloads
+from ..weeklyAggregation import summarize_daily_downloads
+
+
+def daily_range(start: datetime.date, day_count: int, rng: random.Random):
+    return [
+        {
+            "day": (start + datetime.timedelta(days=i)).isoformat(),
+            "downloads": rng.choice([0, rng.randrange(10**6)]),
+        }
+        for i in range(day_count)
+    ]
+
+
+def loop_summary(daily_downloads):
+    weekly_trends = group_weekly_downloads(daily_downloads)
+    return {
+        "weekly_trends": weekly_trends,
+        "growth": compute_growth_metrics(weekly_trends),
+    }
+
+
+def assert_same_summary(vectorized, looped):
+    assert vectorized["weekly_trends"] == looped["weekly_trends"]
+    assert vectorized["growth"] == pytest.approx(looped["growth"])
+
+
+def test_matches_the_per_package_loop():
+    rng = random.Random(0)
+    first_day = datetime.date(2025, 1, 1)
+    # Ranges of different lengths, starting on every weekday, in one batch
+    daily_series = [
+        daily_range(
+            first_day + datetime.timedelta(days=rng.randrange(30)),
+            rng.randrange(0, 70),
+            rng,
+        )
+        for _ in range(200)
+    ]
+    for vectorized, daily_downloads in zip(
+        summarize_daily_downloads(daily_series), daily_series
+    ):
+        assert_same_summary(vectorized, loop_summary(daily_downloads))
+
+
+def test_partial_weeks_are_dropped():
+    # Wednesday 2025-01-01 to Tuesday 2025-01-21: one full week in between
+    daily_downloads = daily_range(datetime.date(2025, 1, 1), 21, random.Random(1))
+    [summary] = summarize_daily_downloads([daily_downloads])
+    assert summary["weekly_trends"] == [
+        {
+            "week_ending": "2025-01-12",
+            "downloads": sum(day["downloads"] for day in daily_downloads[5:12]),
+        },
+        {
+            "week_ending": "2025-01-19",
+            "downloads": sum(day["downloads"] for day in daily_downloads[12:19]),
+        },
+    ]
+
+
+def test_empty_batch_and_empty_series():
+    assert summarize_daily_downloads([]) == []
+    [summary] = summarize_daily_downloads([[]])
+    assert_same_summary(summary, loop_summary([]))
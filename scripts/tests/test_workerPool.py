@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from ..workerPool import run_worker_pool
+
+
+async def numbers(count: int, fail_after: int | None = None):
+    for number in range(count):
+        if number == fail_after:
+            raise RuntimeError("producer failed")
+        await asyncio.sleep(0)
+        yield number
+
+
+def test_every_item_is_processed():
+    processed = []
+
+    async def worker(number):
+        await asyncio.sleep(0.001 * (number % 3))
+        processed.append(number)
+
+    asyncio.run(run_worker_pool(numbers(50), worker, concurrency=4))
+    assert sorted(processed) == list(range(50))
+
+
+def test_producer_failure_stops_the_workers():
+    running = set()
+    cancelled = []
+
+    async def worker(number):
+        running.add(number)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(number)
+            raise
+        finally:
+            running.discard(number)
+
+    async def run():
+        with pytest.raises(RuntimeError, match="producer failed"):
+            await run_worker_pool(numbers(10, fail_after=3), worker, concurrency=2)
+        # Nothing is left running once the error reaches the caller
+        assert not running
+        assert len(asyncio.all_tasks()) == 1
+
+    asyncio.run(run())
+    assert sorted(cancelled) == [0, 1]
+
+
+def test_worker_failure_stops_the_producer():
+    produced = []
+
+    async def items():
+        async for number in numbers(1000):
+            produced.append(number)
+            yield number
+
+    async def worker(number):
+        if number == 5:
+            raise ValueError("worker failed")
+
+    with pytest.raises(ValueError, match="worker failed"):
+        asyncio.run(run_worker_pool(items(), worker, concurrency=2))
+    assert len(produced) < 1000
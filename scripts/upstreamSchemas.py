@@ -0,0 +1,177 @@
+import datetime
+from typing import Any, Dict, List, TypedDict
+
+import msgspec
+
+# Typed schemas of the upstream responses, decoded with msgspec. Only the
+# fields we use are declared; everything else is skipped by the decoder
+# without building Python objects for it.
+
+
+# registry.npmjs.org/{name}
+
+
+class VersionManifest(msgspec.Struct):
+    # Old packuments occasionally hold lists here; they count as no dependencies
+    dependencies: Dict[str, Any] | List[Any] | None = None
+    peerDependencies: Dict[str, Any] | List[Any] | None = None
+
+
+class Packument(msgspec.Struct):
+    dist_tags: Any = msgspec.field(default=None, name="dist-tags")
+    description: Any = ""
+    keywords: Any = msgspec.field(default_factory=list)
+    time: Any = None
+    # Left undecoded; only the latest version is decoded afterwards
+    versions: Dict[str, msgspec.Raw] = msgspec.field(default_factory=dict)
+
+
+class PackumentSummary(TypedDict):
+    """The fields of a packument the ingester stores."""
+
+    latest_version: str
+    description: str
+    keywords: List[str] | str | None
+    dependencies: List[str]
+    peerDependencies: List[str]
+    created_at: str | None
+    modified_at: str | None
+
+
+# api.npmjs.org/downloads/range/{period}/{names}
+
+
+class DailyDownloads(TypedDict):
+    day: str
+    downloads: int
+
+
+class DownloadsRange(TypedDict, total=False):
+    package: str
+    start: str
+    end: str
+    downloads: List[DailyDownloads]
+
+
+# packages.ecosyste.ms/api/v1/registries/npmjs.org/packages/{name}
+
+
+class EcosystemPackage(msgspec.Struct):
+    downloads: int | None = 0
+    dependent_packages_count: int | None = 0
+    dependent_repos_count: int | None = 0
+
+
+# Fields $set on a package document
+
+
+class WeeklyDownloads(TypedDict):
+    week_ending: str
+    downloads: int
+
+
+class PackageDownloads(TypedDict):
+    total: int | None
+    weekly_trends: List[WeeklyDownloads]
+
+
+class NpmTimestamps(TypedDict):
+    created_at: str | None
+    modified_at: str | None
+
+
+class RegistryCache(TypedDict):
+    etag: str | None
+    last_modified: str | None
+
+
+class RefreshSchedule(TypedDict):
+    tier: str
+    next_due_at: datetime.datetime
+
+
+class PackageUpdate(TypedDict, total=False):
+    downloads: PackageDownloads
+    dependent_packages_count: int | None
+    dependent_repos_count: int | None
+    avgGrowth: float
+    lastWeekGrowth: float
+    weeklyDownloadDelta: float
+    db_updated_at: datetime.datetime
+    ingest_run_id: str
+    description: str
+    link: str
+    dependencies: List[str]
+    peerDependencies: List[str]
+    latest_version: str
+    keywords: List[str] | str | None
+    keywords_normalized: List[str]
+    npm_timestamps: NpmTimestamps
+    registry_cache: RegistryCache
+    refresh: RefreshSchedule
+
+
+packument_decoder = msgspec.json.Decoder(Packument)
+version_decoder = msgspec.json.Decoder(VersionManifest)
+downloads_range_decoder = msgspec.json.Decoder(DownloadsRange)
+bulk_downloads_range_decoder = msgspec.json.Decoder(Dict[str, DownloadsRange | None])
+ecosystem_package_decoder = msgspec.json.Decoder(EcosystemPackage)
+
+
+def dependency_names(dependencies) -> List[str]:
+    return list(dependencies) if isinstance(dependencies, dict) else []
+
+
+def decode_packument(body: bytes) -> PackumentSummary:
+    """
+    Decode a packument into the same summary as PackumentExtractor. Only the
+    latest version's manifest is decoded; the others stay raw bytes.
+    """
+    packument = packument_decoder.decode(body)
+    dist_tags = packument.dist_tags if isinstance(packument.dist_tags, dict) else {}
+    latest_version = dist_tags.get("latest")
+    if not isinstance(latest_version, str) or latest_version not in packument.versions:
+        raise Exception("No version information found")
+    manifest = version_decoder.decode(packument.versions[latest_version])
+    time_data = packument.time if isinstance(packument.time, dict) else {}
+    keywords = packument.keywords
+    if isinstance(keywords, list):
+        keywords = [keyword for keyword in keywords if isinstance(keyword, str)]
+    elif not isinstance(keywords, str):
+        keywords = None
+    return {
+        "latest_version": latest_version,
+        "description": (
+            packument.description if isinstance(packument.description, str) else ""
+        ),
+        "keywords": keywords,
+        "dependencies": dependency_names(manifest.dependencies),
+        "peerDependencies": dependency_names(manifest.peerDependencies),
+        "created_at": time_data.get("created"),
+        "modified_at": time_data.get("modified"),
+    }
+
+
+def decode_downloads_range(body: bytes) -> DownloadsRange:
+    """A single-package range response, as a plain dict."""
+    return downloads_range_decoder.decode(body)
+
+
+def decode_bulk_downloads_range(body: bytes) -> Dict[str, DownloadsRange | None]:
+    """A bulk range response: name -> range dict, or None for unknown packages."""
+    return bulk_downloads_range_decoder.decode(body)
+
+
+def decode_ecosystem_stats(body: bytes) -> Dict:
+    """The ecosyste.ms stats the ingester stores, keyed as in the stats cache."""
+    package = ecosystem_package_decoder.decode(body)
+    return {
+        "total_downloads": package.downloads,
+        "dependent_packages_count": package.dependent_packages_count,
+        "dependent_repos_count": package.dependent_repos_count,
+    }
+
+
+def validate_package_update(fields: Dict):
+    """Raise msgspec.ValidationError if the fields do not match PackageUpdate."""
+    msgspec.convert(fields, PackageUpdate)
@@ -0,0 +1,128 @@
+from typing import Dict, List
+
+import numpy as np
+
+# numpy day 0 (1970-01-01) was a Thursday; this shifts it so Monday is 0
+_EPOCH_WEEKDAY = 3
+
+
+def build_daily_matrix(daily_series: List[List[Dict]]):
+    """
+    Lay out the daily downloads of many packages on one shared calendar.
+    Returns (first day, packages x days download counts, packages x days mask
+    of days that were actually reported).
+    """
+    lengths = np.fromiter(
+        (len(daily) for daily in daily_series), np.int64, count=len(daily_series)
+    )
+    days = np.array(
+        [day["day"] for daily in daily_series for day in daily], dtype="datetime64[D]"
+    )
+    counts = np.fromiter(
+        (day["downloads"] for daily in daily_series for day in daily),
+        np.int64,
+        count=len(days),
+    )
+    if not len(days):
+        empty = np.zeros((len(daily_series), 0), np.int64)
+        return np.datetime64("1970-01-01", "D"), empty, empty.astype(bool)
+
+    start = days.min()
+    columns = (days - start).astype(np.int64)
+    rows = np.repeat(np.arange(len(daily_series)), lengths)
+    downloads = np.zeros((len(daily_series), columns.max() + 1), np.int64)
+    present = np.zeros(downloads.shape, bool)
+    downloads[rows, columns] = counts
+    present[rows, columns] = True
+    return start, downloads, present
+
+
+def aggregate_weeks(start: np.datetime64, downloads: np.ndarray, present: np.ndarray):
+    """
+    Sum a daily matrix into Monday to Sunday weeks.
+    Returns (week ending dates, packages x weeks sums, packages x weeks mask of
+    weeks with all 7 days reported). Days before the first Monday are dropped.
+    """
+    weekday = (start.astype(np.int64) + _EPOCH_WEEKDAY) % 7
+    first_monday = (7 - weekday) % 7
+    week_count = max(0, (downloads.shape[1] - first_monday) // 7)
+    span = slice(first_monday, first_monday + week_count * 7)
+    shape = (downloads.shape[0], week_count, 7)
+
+    weekly = downloads[:, span].reshape(shape).sum(axis=2)
+    complete = present[:, span].reshape(shape).all(axis=2)
+    week_endings = start + first_monday + 6 + 7 * np.arange(week_count)
+    return week_endings, weekly, complete
+
+
+def growth_statistics(
+    weekly: np.ndarray, complete: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized downloadTrends.compute_growth_metrics over each package's
+    complete weeks: the most recent one is left out and growth after a 0 week
+    counts as 0.
+    """
+    package_count, week_count = weekly.shape
+    rows = np.arange(package_count)
+    # Move every package's complete weeks to the front, keeping their order
+    order = np.argsort(~complete, axis=1, kind="stable")
+    packed = np.take_along_axis(weekly, order, axis=1).astype(np.float64)
+    full_weeks = np.maximum(complete.sum(axis=1) - 1, 0)
+
+    previous, current = packed[:, :-1], packed[:, 1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(previous == 0, 0.0, (current - previous) / previous * 100)
+    pair_counts = np.maximum(full_weeks - 1, 0)
+    valid = np.arange(max(week_count - 1, 0)) < pair_counts[:, None]
+    growth = np.where(valid, growth, 0.0)
+
+    has_growth = pair_counts > 0
+    last_pair = np.maximum(pair_counts - 1, 0)
+    last_full = np.maximum(full_weeks - 1, 0)
+    avg_growth = np.where(
+        has_growth, growth.sum(axis=1) / np.maximum(pair_counts, 1), 0
+    )
+    if week_count > 1:
+        last_growth = np.where(has_growth, growth[rows, last_pair], 0)
+        delta = np.where(
+            has_growth,
+            packed[rows, last_full] - packed[rows, np.maximum(last_full - 1, 0)],
+            0,
+        )
+    else:
+        last_growth = delta = np.zeros(package_count)
+    return {
+        "avgGrowth": avg_growth,
+        "lastWeekGrowth": last_growth,
+        "weeklyDownloadDelta": delta.astype(np.int64),
+    }
+
+
+def summarize_daily_downloads(daily_series: List[List[Dict]]) -> List[Dict]:
+    """
+    Weekly trends and growth metrics for many packages in one vectorized pass.
+    Returns one {"weekly_trends": [...], "growth": {...}} per input series,
+    built from plain Python values so the results can go straight to MongoDB.
+    """
+    start, downloads, present = build_daily_matrix(daily_series)
+    week_endings, weekly, complete = aggregate_weeks(start, downloads, present)
+    growth = {
+        field: values.tolist()
+        for field, values in growth_statistics(weekly, complete).items()
+    }
+    week_endings = [str(week_ending) for week_ending in week_endings]
+
+    summaries = []
+    for i, (sums, full) in enumerate(zip(weekly.tolist(), complete.tolist())):
+        summaries.append(
+            {
+                "weekly_trends": [
+                    {"week_ending": week_ending, "downloads": total}
+                    for week_ending, total, is_full in zip(week_endings, sums, full)
+                    if is_full
+                ],
+                "growth": {field: values[i] for field, values in growth.items()},
+            }
+        )
+    return summaries
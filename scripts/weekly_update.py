@@ -1,64 +1,147 @@
 #!/usr/bin/env python3
+import argparse
 import asyncio
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from .fetchPackagesWithInfo import TopPackagesFetcher
-from .processPackagesInfo import NPMPackageProcessor
+from .database import close_client, get_client
+from .fetchPackagesWithInfo import (
+    TopPackagesFetcher,
+    diff_rankings,
+    print_ranking_diff,
+    rank_names,
+)
+from .indexManager import IndexManager
+from .packageIngester import NPMPackageIngester
+from .sharding import format_shard, parse_shard
 from .syncMetadata import SyncMetadata  # Import the sync metadata module
-from .updateExistingPackages import NPMPackageUpdater
 
+# An unfinished run older than this is abandoned and a fresh one is started
+RESUME_WINDOW = timedelta(days=6)
 
-async def main():
-    overall_start = time.time()
 
-    # Fetch packages
-    step_start = datetime.now()
-    print(f"Starting fetch_packages at {step_start.isoformat()}")
-    fetcher = TopPackagesFetcher(
-        skip=0, output_file="data/package_names_ephemeral.json"
-    )
-    packages = await fetcher.fetch_all_packages()
-    if packages:
-        fetcher.save_packages(packages)
-        print(f"Total packages fetched: {len(packages)}")
-    else:
-        print("Failed to fetch packages")
+async def main(shard: tuple[int, int] | None = None, parse_workers: int = 0):
+    # One pooled async Mongo client shared by every step of the run
+    client = get_client()
+    try:
+        await run_weekly_update(client, shard=shard, parse_workers=parse_workers)
+    finally:
+        await close_client()
+
+
+async def get_or_start_run(sync: SyncMetadata):
+    """Resume the unfinished run from the journal, or start a new one."""
+    run = await sync.get_current_run()
+    if run and datetime.now() - run["started_at"] < RESUME_WINDOW:
+        print(f"Resuming run {run['run_id']} from phase {run['phase']}")
+        return run
+    return await sync.start_run()
+
+
+async def run_weekly_update(
+    client, shard: tuple[int, int] | None = None, parse_workers: int = 0
+):
+    overall_start = time.time()
+    # Upserts rely on the unique name index, so make sure it exists first
+    await IndexManager(client=client).ensure_indexes()
+    sync = SyncMetadata(client=client, shard=shard)
+    run = await get_or_start_run(sync)
+    if run["phase"] == "done":
+        print(
+            f"Shard {format_shard(shard)} already finished; waiting for the merge step"
+        )
         return
-    step_end = datetime.now()
-    print(
-        f"Completed fetch_packages at {step_end.isoformat()} (duration: {(step_end - step_start).total_seconds():.2f}s)"
-    )
 
-    # Process new packages
-    step_start = datetime.now()
-    print(f"Starting process_new_packages at {step_start.isoformat()}")
-    processor = NPMPackageProcessor(
-        input_file="data/package_names_ephemeral.json", batch_size=100
-    )
-    await processor.process_packages()
-    step_end = datetime.now()
-    print(
-        f"Completed process_new_packages at {step_end.isoformat()} (duration: {(step_end - step_start).total_seconds():.2f}s)"
-    )
+    # Fetch packages, unless a previous attempt of this run already did
+    packages = run.get("top_names")
+    if packages is None:
+        step_start = datetime.now()
+        print(f"Starting fetch_packages at {step_start.isoformat()}")
+        fetcher = TopPackagesFetcher(
+            skip=0, output_file="data/package_names_ephemeral.ndjson"
+        )
+        packages = await fetcher.fetch_all_packages()
+        if packages:
+            print(f"Total packages fetched: {len(packages)}")
+        else:
+            print("Failed to fetch packages")
+            return
+        previous_ranking = await sync.get_top_ranking()
+        if previous_ranking:
+            print_ranking_diff(
+                diff_rankings(
+                    # Only complete rankings fetched from page 1 are stored
+                    rank_names(previous_ranking),
+                    fetcher.ranks,
+                    complete=not fetcher.missing_pages,
+                )
+            )
+        await sync.update_run(
+            phase="ingest_packages",
+            top_names=packages,
+            missing_pages=fetcher.missing_pages,
+        )
+        run["missing_pages"] = fetcher.missing_pages
+        step_end = datetime.now()
+        print(
+            f"Completed fetch_packages at {step_end.isoformat()} (duration: {(step_end - step_start).total_seconds():.2f}s)"
+        )
 
-    # Update existing packages
+    # Ingest the top list and the due stored packages in a single pass
     step_start = datetime.now()
-    print(f"Starting update_existing_packages at {step_start.isoformat()}")
-    updater = NPMPackageUpdater()
-    await updater.update_all_packages()
+    print(f"Starting ingest_packages at {step_start.isoformat()}")
+    ingester = NPMPackageIngester(
+        batch_size=128,
+        client=client,
+        concurrency=50,
+        run_id=run["run_id"],
+        shard=shard,
+        parse_workers=parse_workers,
+    )
+    # Only packages whose refresh tier is due, plus new and changed ones
+    await ingester.ingest_packages(packages, incremental=True, scheduled=True)
     step_end = datetime.now()
     print(
-        f"Completed update_existing_packages at {step_end.isoformat()} (duration: {(step_end - step_start).total_seconds():.2f}s)"
+        f"Completed ingest_packages at {step_end.isoformat()} (duration: {(step_end - step_start).total_seconds():.2f}s)"
     )
 
-    # Update the last sync date in the database
-    sync = SyncMetadata()
-    sync.update_last_sync()
+    if shard:
+        # The merge step combines every shard's results once all are done
+        await sync.update_run(
+            phase="done",
+            finished_at=datetime.now(),
+            changes_seq=ingester.changes_seq,
+            pending_changed_names=sorted(ingester.pending_changed_names),
+            failed_packages=ingester.failed_packages,
+        )
+    else:
+        await sync.update_run(phase="finalize")
+        # Only a fully completed run updates the last sync date, and only a
+        # complete ranking becomes the base of the next ranking diff
+        if not run.get("missing_pages"):
+            await sync.update_top_ranking(packages)
+        await sync.update_last_sync()
+        await sync.finish_run()
 
     overall_elapsed = time.time() - overall_start
     print(f"Weekly update complete in {overall_elapsed:.2f} seconds.")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Run the weekly leaderboard update")
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="Only update the stable hash partition i of N package names (i/N); "
+        "run scripts.mergeShards once every shard has finished",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="Processes that decode large packuments off the event loop "
+        "(0 decodes them in the event loop's thread)",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.shard, args.parse_workers))
@@ -0,0 +1,68 @@
+import asyncio
+from typing import AsyncIterable, Awaitable, Callable, TypeVar
+
+from .metrics import MetricsRegistry
+
+T = TypeVar("T")
+
+_DONE = object()  # Sentinel telling a worker the producer has finished
+
+
+async def run_worker_pool(
+    items: AsyncIterable[T],
+    worker: Callable[[T], Awaitable[None]],
+    concurrency: int,
+    queue_size: int | None = None,
+    on_progress: Callable[[asyncio.Queue], None] | None = None,
+    progress_interval: float = 30.0,
+    metrics: MetricsRegistry | None = None,
+):
+    """
+    Feed `items` through a bounded queue to `concurrency` workers.
+
+    Unlike gathering fixed batches, a slow item only occupies its own worker;
+    the others keep pulling new items, so `concurrency` requests stay in flight
+    until the producer runs dry. `on_progress` is called with the queue every
+    `progress_interval` seconds and once more at the end. With `metrics`, the
+    queue length is sampled whenever a worker takes an item: a queue that is
+    mostly empty means the producer, not the workers, bounds the throughput.
+    If the producer or a worker raises, the other tasks are cancelled and
+    awaited before the error propagates, so none outlives the call.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or concurrency * 2)
+
+    async def produce():
+        async for item in items:
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(_DONE)
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if metrics:
+                metrics.observe("queue_depth", queue.qsize())
+            await worker(item)
+
+    async def report():
+        while True:
+            await asyncio.sleep(progress_interval)
+            on_progress(queue)
+
+    reporter = asyncio.create_task(report()) if on_progress else None
+    tasks = [asyncio.create_task(produce())]
+    tasks.extend(asyncio.create_task(consume()) for _ in range(concurrency))
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()  # Raises the first failure
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if reporter:
+            reporter.cancel()
+    if on_progress:
+        on_progress(queue)
@@ -1,6 +1,7 @@
 import { NextResponse } from "next/server";
 import clientPromise from "../../../../lib/mongodb";
-import { Document, SortDirection } from "mongodb";
+import { normalizeKeywords } from "../../../../lib/keywords";
+import { SortDirection } from "mongodb";
 
 interface WeeklyTrend {
   week_ending: string;
@@ -16,6 +17,8 @@ interface NPMPackage {
   dependent_packages_count: number;
   dependent_repos_count: number;
   avgGrowth?: number;
+  lastWeekGrowth?: number;
+  weeklyDownloadDelta?: number;
   link: string;
   name: string;
   description: string;
@@ -27,14 +30,19 @@ export async function GET(request: Request) {
   const keywords = searchParams.get("keywords") || ""; // Space separated keywords
   const modifiedParam = searchParams.get("modified"); // Number of days as a string
 
+  const client = await clientPromise;
+  const db = client.db("npm-leaderboard");
+
   // Build the base query
   const query: Record<string, unknown> = {};
   if (dependsOn) {
-    const regex = new RegExp(dependsOn, "i");
-    query.$or = [
-      { dependencies: { $in: [regex] } },
-      { peerDependencies: { $in: [regex] } },
-    ];
+    // Exact-match lookup in the reverse-dependency collection the ingester
+    // maintains (regular and peer dependencies)
+    const edges = await db
+      .collection("dependents")
+      .find({ dependency: dependsOn.trim() }, { projection: { dependent: 1 } })
+      .toArray();
+    query.name = { $in: edges.map((edge) => edge.dependent) };
   }
 
   // If the modified parameter is provided and is a valid number > 0,
@@ -49,155 +57,33 @@ export async function GET(request: Request) {
     }
   }
 
-  // --- New: Lenient keyword search ---
-  // If keywords are provided, split by space and convert each into a regex.
-  // This simple approach strips any trailing "s" and allows an optional "s".
+  // Keywords are matched against keywords_normalized, which the ingester
+  // fills with the same normalization (lowercase, trimmed, trailing "s"
+  // dropped), so every keyword is an exact multikey index match.
   if (keywords) {
-    const keywordArray = keywords.split(/\s+/).map((kw) => {
-      // Remove trailing "s" to get a base form
-      const base = kw.replace(/s$/i, "");
-      // Create a regex that matches the base with an optional "s" at the end, case-insensitively
-      return new RegExp(`^${base}s?$`, "i");
-    });
-    // Use $all to ensure that every keyword must be matched in the keywords array.
-    query.keywords = { $all: keywordArray };
+    const keywordArray = normalizeKeywords(keywords.split(/\s+/));
+    if (keywordArray.length > 0) {
+      query.keywords_normalized = { $all: keywordArray };
+    }
   }
-  // --------------------------------
 
   let sortCriteria: Record<string, number> = {};
   if (sortBy === "downloads") {
     sortCriteria = { "downloads.total": -1 };
   } else if (sortBy === "dependents") {
     sortCriteria = { dependent_repos_count: -1 };
+  } else if (sortBy === "growth") {
+    // avgGrowth is precomputed by the ingester and indexed
+    query.name = { ...(query.name as object), $not: /^@/ };
+    sortCriteria = { avgGrowth: -1 };
   }
 
-  const client = await clientPromise;
-  const db = client.db("npm-leaderboard");
-
-  let packages: NPMPackage[] = [];
-  if (sortBy === "growth") {
-    const pipeline: Document[] = [];
-    if (Object.keys(query).length > 0) {
-      pipeline.push({ $match: query });
-    }
-    pipeline.push(
-      {
-        $match: {
-          name: { $not: { $regex: "^@" } },
-        },
-      },
-      {
-        $addFields: {
-          weeklyDownloads: {
-            $map: {
-              input: "$downloads.weekly_trends",
-              as: "wt",
-              in: "$$wt.downloads",
-            },
-          },
-        },
-      },
-      {
-        $addFields: {
-          fullWeeklyDownloads: {
-            $slice: [
-              "$weeklyDownloads",
-              0,
-              { $subtract: [{ $size: "$weeklyDownloads" }, 1] },
-            ],
-          },
-        },
-      },
-      {
-        $addFields: {
-          growthPercentages: {
-            $cond: [
-              { $gt: [{ $size: "$fullWeeklyDownloads" }, 1] },
-              {
-                $map: {
-                  input: { $range: [1, { $size: "$fullWeeklyDownloads" }] },
-                  as: "i",
-                  in: {
-                    $cond: {
-                      if: {
-                        $eq: [
-                          {
-                            $arrayElemAt: [
-                              "$fullWeeklyDownloads",
-                              { $subtract: ["$$i", 1] },
-                            ],
-                          },
-                          0,
-                        ],
-                      },
-                      then: 0,
-                      else: {
-                        $multiply: [
-                          {
-                            $divide: [
-                              {
-                                $subtract: [
-                                  {
-                                    $arrayElemAt: [
-                                      "$fullWeeklyDownloads",
-                                      "$$i",
-                                    ],
-                                  },
-                                  {
-                                    $arrayElemAt: [
-                                      "$fullWeeklyDownloads",
-                                      { $subtract: ["$$i", 1] },
-                                    ],
-                                  },
-                                ],
-                              },
-                              {
-                                $arrayElemAt: [
-                                  "$fullWeeklyDownloads",
-                                  { $subtract: ["$$i", 1] },
-                                ],
-                              },
-                            ],
-                          },
-                          100,
-                        ],
-                      },
-                    },
-                  },
-                },
-              },
-              [],
-            ],
-          },
-        },
-      },
-      {
-        $addFields: {
-          avgGrowth: {
-            $cond: [
-              { $gt: [{ $size: "$growthPercentages" }, 0] },
-              { $avg: "$growthPercentages" },
-              0,
-            ],
-          },
-        },
-      },
-      { $sort: { avgGrowth: -1 } },
-      { $limit: 100 },
-    );
-
-    packages = (await db
-      .collection("packages")
-      .aggregate(pipeline)
-      .toArray()) as NPMPackage[];
-  } else {
-    packages = (await db
-      .collection("packages")
-      .find(query)
-      .sort(sortCriteria as unknown as [string, SortDirection])
-      .limit(100)
-      .toArray()) as NPMPackage[];
-  }
+  const packages = (await db
+    .collection("packages")
+    .find(query)
+    .sort(sortCriteria as unknown as [string, SortDirection])
+    .limit(100)
+    .toArray()) as NPMPackage[];
 
   return NextResponse.json({ packages });
 }
@@ -18,4 +18,6 @@ export interface NPMPackage {
   dependent_packages_count: number;
   dependent_repos_count: number;
   avgGrowth?: number;
+  lastWeekGrowth?: number;
+  weeklyDownloadDelta?: number;
 }